@@ -0,0 +1,69 @@
+# Parse-time benchmark: original html.parser path vs the parsing layer (fast backend + SoupStrainer)
+# Usage: python benchmarks/bench_parsing.py [--pages 200]
+import argparse
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup as bs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import detail_page_html, listing_page_html  # noqa: E402
+from parsing import PARSER, parse_detail, parse_listing  # noqa: E402
+from scraper import CATEGORIES  # noqa: E402
+
+# The parsing code as it was before the parsing layer
+def baseline_detail(content, spec):
+    soup_container = bs(content, "html.parser")
+    details = soup_container.find('h1', "title title-ad hide-on-large-and-down").text
+    price_tag = soup_container.find('p', "price")
+    price = "".join(price_tag.text.strip().split()).replace('CFA', '') if price_tag else None
+    address_tags = soup_container.find_all('span', 'valign-wrapper')
+    address = address_tags[spec.address_index].text.strip() if len(address_tags) > spec.address_index else None
+    p_details = soup_container.find_all('div', class_="details-characteristics")[0] if soup_container.find_all('div', class_="details-characteristics") else None
+    j = p_details.find_all('span', 'qt') if p_details else []
+    number_of_rooms = j[0].text.strip() if len(j) > 0 else None
+    img = soup_container.find('div', class_="swiper-slide slide-clickable")
+    style = img.get('style') if img else ''
+    image_link = style.split('url(')[1].split(')')[0].strip('"') if style and 'url(' in style else None
+    return {"details": details, "price": price, "address": address, "number_of_rooms": number_of_rooms, "image_link": image_link}
+
+
+def baseline_listing(content):
+    return bs(content, 'html.parser').find_all('div', class_='col s6 m4 l3')
+
+
+def timed(label, func, pages):
+    start = time.perf_counter()
+    for page in pages:
+        func(page)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<45} {elapsed / len(pages) * 1000:8.2f} ms/page")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare parse time per page of the old and new parsing paths')
+    parser.add_argument('--pages', type=int, default=200)
+    args = parser.parse_args()
+
+    spec = CATEGORIES["villas"]
+    details = [detail_page_html(spec.slug, i).encode('utf-8') for i in range(args.pages)]
+    listings = [listing_page_html(spec.slug, i) for i in range(max(1, args.pages // 10))]
+
+    # Both paths must extract exactly the same records
+    assert all(parse_detail(page, spec) == baseline_detail(page, spec) for page in details[:20])
+    assert all(len(parse_listing(page)) == len(baseline_listing(page)) for page in listings[:5])
+
+    print(f"Fast backend: {PARSER}")
+    base = timed("detail page, html.parser full tree", lambda page: baseline_detail(page, spec), details)
+    fast = timed(f"detail page, {PARSER} + SoupStrainer", lambda page: parse_detail(page, spec), details)
+    print(f"{'speedup':<45} {base / fast:8.2f}x")
+    base = timed("listing page, html.parser full tree", baseline_listing, listings)
+    fast = timed(f"listing page, {PARSER} + SoupStrainer", parse_listing, listings)
+    print(f"{'speedup':<45} {base / fast:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
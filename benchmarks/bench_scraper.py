@@ -0,0 +1,198 @@
+# Scraper throughput benchmark against the local mock site (no request reaches Coinafrique)
+# Reports listings/sec, p50/p99 request latency, CPU time per listing and peak memory per category.
+# Usage: python benchmarks/bench_scraper.py [villas terrains ...] [--pages 10] [--latency 0.05]
+#            [--error-rate 0.02] [--store sqlite] [--memory] [--save out.json] [--compare base.json]
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import init_database  # noqa: E402
+from jobs import start_job  # noqa: E402
+from mock_site import MockSite  # noqa: E402
+from rate_limiter import AdaptiveRateLimiter  # noqa: E402
+from scraper import CATEGORIES, DEFAULT_PER_HOST, DEFAULT_WORKERS, FetchEngine, ScraperClient, scrape_category  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Metrics compared with --compare, and whether higher values are better
+COMPARED = {"listings_per_sec": True, "cpu_ms_per_listing": False}
+
+
+# Client recording the latency of every request (including retries and limiter waits)
+class TimedClient(ScraperClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies = []
+        self._latency_lock = threading.Lock()
+
+    def get(self, url, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().get(url, *args, **kwargs)
+        finally:
+            with self._latency_lock:
+                self.latencies.append(time.perf_counter() - start)
+
+
+# The mock site runs in its own process, so that its CPU time is not charged to the scraper
+def _serve(options, connection):
+    site = MockSite(**options)
+    connection.send(site.url)
+    site._server.serve_forever()
+
+
+def start_site(**options):
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve, args=(options, child), daemon=True)
+    process.start()
+    return process, parent.recv()
+
+
+def scrape_once(spec, args, base_url, db_path=None):
+    rate_limiter = AdaptiveRateLimiter(rate=args.rate, max_rate=args.rate * 4) if args.rate else None
+    client = TimedClient(pool_size=args.workers, retries=args.retries, rate_limiter=rate_limiter)
+    engine = FetchEngine(client=client, max_workers=args.workers, per_host=args.per_host, base_url=base_url)
+    try:
+        if db_path:
+            _, stats = start_job(spec, args.pages, engine, incremental=False, db_path=db_path)
+            listings = stats["saved"]
+        else:
+            listings = len(scrape_category(spec, args.pages, engine))
+    finally:
+        client.close()
+    return listings, client
+
+
+def bench_category(spec, args, base_url):
+    db_path = None
+    if args.store == "sqlite":
+        db_path = os.path.join(tempfile.mkdtemp(prefix="bench_scraper_"), "bench.db")
+        init_database(db_path)
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    listings, client = scrape_once(spec, args, base_url, db_path)
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    latencies = np.array(client.latencies) * 1000
+    http_stats = client.summary()
+    result = {
+        "category": spec.key,
+        "listings": listings,
+        "seconds": round(wall, 3),
+        "listings_per_sec": round(listings / wall, 2) if wall else 0.0,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2) if len(latencies) else None,
+        "requests": http_stats["requests"],
+        "errors": http_stats["errors"],
+        "retries": http_stats["retries"],
+        "cpu_ms_per_listing": round(cpu / listings * 1000, 3) if listings else None,
+    }
+
+    # Separate pass: tracemalloc slows the scraper down, so it is kept out of the timings
+    if args.memory:
+        tracemalloc.start()
+        scrape_once(spec, args, base_url, db_path)
+        result["peak_python_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        tracemalloc.stop()
+    return result
+
+
+def print_results(results):
+    columns = ["category", "listings", "seconds", "listings_per_sec", "p50_ms", "p99_ms",
+               "requests", "errors", "retries", "cpu_ms_per_listing"]
+    if any("peak_python_mb" in result for result in results):
+        columns.append("peak_python_mb")
+    print(" ".join(f"{column:>18}" for column in columns))
+    for result in results:
+        print(" ".join(f"{str(result.get(column)):>18}" for column in columns))
+
+
+# Metrics that regressed by more than tolerance against a saved run
+def regressions(results, baseline, tolerance):
+    previous = {result["category"]: result for result in baseline["results"]}
+    found = []
+    for result in results:
+        before = previous.get(result["category"])
+        if not before:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                found.append(f"{result['category']} {metric}: {old} -> {new} ({change:+.0%})")
+    return found
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Benchmark the scrapers against a local mock Coinafrique site')
+    parser.add_argument('categories', nargs='*', metavar='category', help=f"{', '.join(CATEGORIES)} (default: all)")
+    parser.add_argument('--pages', type=int, default=5, help="category pages per category")
+    parser.add_argument('--per-page', type=int, default=24, help="listings per category page")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST)
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--rate', type=float, default=0.0, help="initial limiter rate in req/s (0: no rate limiter)")
+    parser.add_argument('--latency', type=float, default=0.02, help="mean response latency of the mock site (s)")
+    parser.add_argument('--fixed-latency', action='store_true', help="constant instead of exponential latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of mock responses that fail")
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--store', choices=("memory", "sqlite"), default="memory",
+                        help="keep records in memory (scrape_category) or run a full job into a temporary database")
+    parser.add_argument('--memory', action='store_true', help="measure peak Python memory in an extra tracemalloc pass")
+    parser.add_argument('--save', metavar='JSON', help="write the results to a file")
+    parser.add_argument('--compare', metavar='JSON', help="fail when throughput or CPU per listing regressed against a saved run")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="allowed relative regression with --compare")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    unknown = [key for key in args.categories if key not in CATEGORIES]
+    if unknown:
+        parser.error(f"unknown categories: {', '.join(unknown)}")
+
+    process, base_url = start_site(
+        latency=args.latency, jitter=not args.fixed_latency, error_rate=args.error_rate,
+        error_status=args.error_status, per_page=args.per_page
+    )
+    try:
+        results = [bench_category(CATEGORIES[key], args, base_url) for key in (args.categories or CATEGORIES)]
+    finally:
+        process.terminate()
+
+    print_results(results)
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux
+        print(f"peak RSS of the benchmark process: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+    report = {"settings": {key: value for key, value in vars(args).items() if key not in ("save", "compare")}, "results": results}
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
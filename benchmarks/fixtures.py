@@ -0,0 +1,47 @@
+# Synthetic Coinafrique pages with the markup the scrapers parse, shared by the benchmarks
+# (served by mock_site.py, parsed directly by bench_parsing.py)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper import CATEGORIES  # noqa: E402
+
+# Navigation, footer and scripts around the ad, roughly the weight of a real Coinafrique page
+BOILERPLATE = "".join(
+    f'<div class="card"><a href="/categorie/{i}">Catégorie {i}</a><p class="description">Lorem ipsum dolor sit amet {i}</p></div>'
+    for i in range(150)
+) + "<script>var tracking = {};</script>" * 20
+DISTRICTS = ("Ouakam", "Almadies", "Mermoz", "Ngor", "Yoff", "Sacré Coeur", "Point E", "Saly", "Mbour", "Lac Rose")
+SPECS_BY_SLUG = {spec.slug: spec for spec in CATEGORIES.values()}
+
+
+def listing_page_html(slug, page, per_page=24):
+    cards = "".join(
+        f'<div class="col s6 m4 l3"><div class="card ad__card"><a href="/annonce/{slug}/annonce-{page}-{i}-{page * 1000 + i}">'
+        f'<p class="ad__card-price">{(i + 1) * 100000} CFA</p></a></div></div>'
+        for i in range(per_page)
+    )
+    return f"<html><head><title>{slug}</title></head><body>{BOILERPLATE}<div class='row'>{cards}</div>{BOILERPLATE}</body></html>"
+
+
+def detail_page_html(slug, ad_id):
+    spec = SPECS_BY_SLUG.get(slug, CATEGORIES["villas"])
+    rooms = ad_id % 7 + 2
+    surface = ad_id % 500 + 100
+    title = f"Terrain {surface} m2 {DISTRICTS[ad_id % len(DISTRICTS)]}" if spec.key == "terrains" else f"{spec.key.title()} {rooms} pièces à louer"
+    # The address is the valign-wrapper the category's parser reads
+    spans = ['<span class="valign-wrapper"><span class="material-icons">access_time</span>il y a 2 jours</span>']
+    spans.insert(spec.address_index, f'<span class="valign-wrapper"><span class="material-icons">location_on</span>'
+                                     f'{DISTRICTS[ad_id % len(DISTRICTS)]}, Dakar, Sénégal</span>')
+    return f"""<html><head><title>Annonce {ad_id}</title></head><body>{BOILERPLATE}
+    <h1 class="title title-ad hide-on-large-and-down">{title}</h1>
+    <p class="price">{ad_id * 1000 + 250000} CFA</p>
+    {"".join(spans)}
+    <div class="details-characteristics"><ul>
+        <li><span>Nbre de pièces</span><span class="qt">{rooms}</span></li>
+        <li><span>Nbre de salle de bain</span><span class="qt">2</span></li>
+        <li><span>Superficie</span><span class="qt">{surface} m2</span></li>
+    </ul></div>
+    <div class="swiper-slide slide-clickable" style="background-image: url(https://images.coinafrique.com/{ad_id}.jpg)"></div>
+    {BOILERPLATE}</body></html>"""
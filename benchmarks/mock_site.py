@@ -0,0 +1,133 @@
+# Local stand-in for sn.coinafrique.com: synthetic category and detail pages with the markup
+# the scrapers parse, plus configurable latency and error injection
+# Usage: python benchmarks/mock_site.py [--port 8765] [--latency 0.05] [--error-rate 0.02]
+#        then e.g. python cli.py villas --pages 5 --base-url http://127.0.0.1:8765
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import random
+import re
+import threading
+import time
+
+from fixtures import detail_page_html, listing_page_html
+
+CATEGORY_PATH = re.compile(r'^/categorie/([\w-]+)\?(?:.*&)?page=(\d+)')
+DETAIL_PATH = re.compile(r'^/annonce/([\w-]+)/[\w-]*?-(\d+)/?$')
+
+
+# Threaded HTTP server serving the synthetic site
+# latency: mean seconds added to every response (exponentially distributed when jitter is True)
+# error_rate: share of requests answered with error_status (429 responses carry Retry-After: 1)
+# pages: category pages with listings (later pages are empty), per_page: listings per page
+class MockSite:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=True, error_rate=0.0, error_status=503,
+                 pages=1000, per_page=24, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.pages = pages
+        self.per_page = per_page
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _draw(self):
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = self._random.expovariate(1 / self.latency) if self.latency and self.jitter else self.latency
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.stats["errors"] += 1
+        return delay, failed
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                delay, failed = site._draw()
+                if delay:
+                    time.sleep(delay)
+                if failed:
+                    return self._send(site.error_status, b"", {"Retry-After": "1"} if site.error_status == 429 else {})
+                category = CATEGORY_PATH.match(self.path)
+                detail = DETAIL_PATH.match(self.path)
+                if category:
+                    slug, page = category.group(1), int(category.group(2))
+                    body = listing_page_html(slug, page, site.per_page if page <= site.pages else 0)
+                elif detail:
+                    body = detail_page_html(detail.group(1), int(detail.group(2)))
+                else:
+                    return self._send(404, b"")
+                self._send(200, body.encode('utf-8'), {"Content-Type": "text/html; charset=utf-8"})
+
+            def _send(self, status, body, headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Serve a synthetic Coinafrique site locally')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="mean seconds added to each response")
+    parser.add_argument('--fixed-latency', action='store_true', help="constant instead of exponential latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with an error")
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--pages', type=int, default=1000, help="category pages with listings")
+    parser.add_argument('--per-page', type=int, default=24)
+    parser.add_argument('--seed', type=int, default=0)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    site = MockSite(args.host, args.port, args.latency, not args.fixed_latency, args.error_rate,
+                    args.error_status, args.pages, args.per_page, args.seed)
+    print(f"Serving a mock Coinafrique site on {site.url}", flush=True)
+    try:
+        site._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site._server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+# Headless entry point: run the category scrapers without Streamlit (e.g. from cron)
+#
+#   python cli.py villas terrains --pages 10 --workers 8 --output sqlite
+#   python cli.py apartments --pages 50 --output parquet --output-dir data/exports
+#   python cli.py --pages 20 --output warehouse   (partitioned Parquet dataset in data/warehouse)
+#   python cli.py --pages 20 --parallel   (all categories at the same time, sharing the client and rate limiter)
+#   python cli.py terrains --start-page 11 --last-page 20   (pages 11 to 20)
+#   python cli.py --resume 12
+#   python cli.py villas --report run.json   (stage timings, counters and failures of each job as JSON)
+import argparse
+from datetime import datetime
+import logging
+import os
+import sys
+
+from database import DB_PATH, get_job, init_database
+from http_cache import ResponseCache
+from jobs import ScrapeTarget, run_job, run_parallel, start_job
+from metrics import write_report
+from rate_limiter import DEFAULT_MAX_RATE, DEFAULT_RATE, AdaptiveRateLimiter
+from reporters import LogReporter
+from scraper import BASE_URL, CATEGORIES, DEFAULT_PER_HOST, DEFAULT_WORKERS, FetchEngine, ScraperClient
+from sinks import OUTPUTS, make_sink
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Scrape Coinafrique real estate listings")
+    parser.add_argument('categories', nargs='*', metavar='category',
+                        help=f"categories to scrape: {', '.join(CATEGORIES)} (default: all)")
+    parser.add_argument('--pages', '--last-page', dest='pages', type=int, default=3,
+                        help="last category page to scrape (the page count when starting from page 1)")
+    parser.add_argument('--start-page', type=int, default=1, help="first category page to scrape (up to --last-page)")
+    parser.add_argument('--parallel', action='store_true', help="scrape the categories at the same time")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="concurrent detail-page fetches")
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST, help="maximum requests in flight per host")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="initial requests per second")
+    parser.add_argument('--max-rate', type=float, default=DEFAULT_MAX_RATE, help="ceiling of the adaptive request rate")
+    parser.add_argument('--base-url', default=BASE_URL, help="site to scrape (e.g. a local mock site)")
+    parser.add_argument('--output', choices=OUTPUTS, default='sqlite', help="where scraped records are written")
+    parser.add_argument('--output-dir', default=os.path.join('data', 'exports'), help="directory of CSV/Parquet exports")
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database (jobs, checkpoints and sqlite output)")
+    parser.add_argument('--no-incremental', action='store_true', help="fetch listings already in the database again")
+    parser.add_argument('--stop-when-known', action='store_true', help="stop at the first page whose ads are all known")
+    parser.add_argument('--no-cache', action='store_true', help="disable the on-disk HTTP cache")
+    parser.add_argument('--offline', action='store_true', help="replay cached pages only")
+    parser.add_argument('--resume', type=int, metavar='JOB_ID', help="resume an interrupted scrape job")
+    parser.add_argument('--report', metavar='JSON', help="write a run report (stage timings, counters, failures)")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    unknown = [key for key in args.categories if key not in CATEGORIES]
+    if unknown:
+        parser.error(f"unknown categories: {', '.join(unknown)}")
+    if args.start_page > args.pages:
+        parser.error(f"--start-page {args.start_page} is after --last-page {args.pages}")
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s"
+    )
+
+    init_database(args.db)
+    cache = None if args.no_cache else ResponseCache(offline=args.offline)
+    rate_limiter = AdaptiveRateLimiter(rate=args.rate, max_rate=args.max_rate)
+    client = ScraperClient(pool_size=args.workers, cache=cache, rate_limiter=rate_limiter)
+    engine = FetchEngine(client=client, max_workers=args.workers, per_host=args.per_host, base_url=args.base_url)
+    reporter = LogReporter()
+    options = dict(incremental=not args.no_incremental, stop_when_known=args.stop_when_known, db_path=args.db)
+
+    runs = []
+
+    def finished(key, job_id, stats):
+        runs.append({"category": key, "job_id": job_id, **stats})
+        logging.info("[%s] job #%s %s", key, job_id, stats["status"])
+
+    try:
+        if args.resume is not None:
+            job = get_job(args.resume, db_path=args.db)
+            if job is None:
+                logging.error("Unknown job %s", args.resume)
+                return 2
+            targets = [ScrapeTarget(CATEGORIES[job["category"]], job_id=args.resume)]
+        else:
+            targets = [ScrapeTarget(CATEGORIES[key], args.pages, args.start_page) for key in (args.categories or CATEGORIES)]
+
+        if args.parallel:
+            scraped_date = datetime.now()
+            sinks = {
+                target.spec.key: make_sink(args.output, target.spec, scraped_date, output_dir=args.output_dir, db_path=args.db)
+                for target in targets
+            }
+            results = run_parallel(targets, engine, reporters={key: reporter for key in sinks}, sinks=sinks, scraped_date=scraped_date, **options)
+            for key, (job_id, stats) in results.items():
+                finished(key, job_id, stats)
+        else:
+            for target in targets:
+                scraped_date = datetime.now()
+                sink = make_sink(args.output, target.spec, scraped_date, output_dir=args.output_dir, db_path=args.db)
+                if target.job_id is None:
+                    job_id, stats = start_job(
+                        target.spec, target.num_pages, engine, start_page=target.start_page,
+                        reporter=reporter, sink=sink, scraped_date=scraped_date, **options
+                    )
+                else:
+                    job_id, stats = target.job_id, run_job(target.job_id, engine, reporter=reporter, sink=sink, scraped_date=scraped_date, **options)
+                finished(target.spec.key, job_id, stats)
+    finally:
+        http_stats = client.summary()
+        logging.info(
+            "%s requests, %s failed, %s retries, avg %.2fs, %.1f MB, final rate %.1f req/s",
+            http_stats["requests"], http_stats["errors"], http_stats["retries"],
+            http_stats["avg_time"], http_stats["bytes"] / 1e6, http_stats["rate"]
+        )
+        client.close()
+        if args.report:
+            write_report(args.report, runs)
+
+    # Non-zero exit code when listings or pages failed, so cron can alert
+    return 1 if any(run["status"] != 'completed' for run in runs) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
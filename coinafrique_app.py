@@ -2,13 +2,20 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from requests import get
-from bs4 import BeautifulSoup as bs
-import sqlite3
 from datetime import datetime
-import time
+import json
 import os
 import numpy as np # Ajouté pour les vérifications robustes de NaN
+from http_cache import ResponseCache
+from database import enqueue_job, init_database, load_run, recent_jobs, requeue_job, unfinished_jobs
+from dedup import duplicate_stats
+from jobs import ScrapeTarget
+from loaders import CSV_FILES, load_category, load_csv, load_upload, load_warehouse
+from metrics import run_report
+from profiling import RenderProfiler
+from queries import PAGE_SIZES, FrameStore, ListingFilter, SQLStore
+from scraper import CATEGORIES, category_from_label
+from worker import ScrapeWorker
 
 # Page configuration
 st.set_page_config(
@@ -138,255 +145,161 @@ st.markdown("""
 st.markdown('<h1 class="main-title">🏘️ COINAFRICA DATA SCRAPER & DASHBOARD 📊</h1>', unsafe_allow_html=True)
 st.markdown('<p class="subtitle">Intelligent real estate data scraping and analysis in Senegal</p>', unsafe_allow_html=True)
 
-# SQLite database connection
-def init_database():
-    conn = sqlite3.connect('coinafrica.db')
-    c = conn.cursor()
-    
-    # Villas table
-    c.execute('''CREATE TABLE IF NOT EXISTS villas
-             (id INTEGER PRIMARY KEY AUTOINCREMENT,
-              details TEXT,
-              price TEXT,
-              address TEXT,
-              number_of_rooms TEXT,
-              image_link TEXT,
-              scraped_date TIMESTAMP)''')
-    
-    # Terrains table
-    c.execute('''CREATE TABLE IF NOT EXISTS terrains
-             (id INTEGER PRIMARY KEY AUTOINCREMENT,
-              details TEXT,
-              price TEXT,
-              address TEXT,
-              surface TEXT,
-              image_link TEXT,
-              scraped_date TIMESTAMP)''')
-    
-    # Apartments table
-    c.execute('''CREATE TABLE IF NOT EXISTS apartments
-             (id INTEGER PRIMARY KEY AUTOINCREMENT,
-              details TEXT,
-              price TEXT,
-              address TEXT,
-              number_of_rooms TEXT,
-              image_link TEXT,
-              scraped_date TIMESTAMP)''')
-    
-    conn.commit()
-    conn.close()
-
 init_database()
 
-# Scraping function for villas
-def scrape_villas(num_pages):
-    df = pd.DataFrame()
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
-    for index in range(1, num_pages + 1):
-        status_text.text(f"🔍 Scraping page {index}/{num_pages}...")
-        url = f'https://sn.coinafrique.com/categorie/villas?page={index}'
-        
-        try:
-            res = get(url, timeout=10)
-            soup = bs(res.content, 'html.parser')
-            containers = soup.find_all('div', class_='col s6 m4 l3')
-            
-            data = []
-            for container in containers:
-                try:
-                    # Optimized: Check if the property link is absolute or relative
-                    href = container.find('a')["href"]
-                    container_url = href if href.startswith('http') else "https://sn.coinafrique.com" + href
+# On-disk cache of category and detail pages (size and default freshness shown on the scrape page)
+response_cache = ResponseCache()
+# Columns the dashboard reads from the columnar warehouse
+DASHBOARD_COLUMNS = ("ad_id", "details", "price", "address", "price_numeric", "rooms", "surface_m2", "scraped_date")
+# Seconds between two refreshes of the scrape job list while jobs are queued or running
+JOB_POLL_SECONDS = 2
 
-                    res_container = get(container_url, timeout=10)
-                    soup_container = bs(res_container.content, "html.parser")
-                    
-                    details = soup_container.find('h1', "title title-ad hide-on-large-and-down").text
-                    # Cleaning price: removing spaces and 'CFA'
-                    price_tag = soup_container.find('p', "price")
-                    price = "".join(price_tag.text.strip().split()).replace('CFA', '') if price_tag else None
-                    
-                    # Assuming address is the second 'valign-wrapper' for villas
-                    address_tags = soup_container.find_all('span', 'valign-wrapper')
-                    address = address_tags[1].text.strip() if len(address_tags) > 1 else None
-                    
-                    # Finding number of rooms
-                    p_details = soup_container.find_all('div', class_="details-characteristics")[0] if soup_container.find_all('div', class_="details-characteristics") else None
-                    j = p_details.find_all('span', 'qt') if p_details else []
-                    # First 'qt' element is often the number of rooms/pieces
-                    number_of_rooms = j[0].text.strip() if len(j) > 0 else None
-                    
-                    # Extracting image link from style attribute
-                    img = soup_container.find('div', class_="swiper-slide slide-clickable")
-                    style = img.get('style') if img else ''
-                    image_link = style.split('url(')[1].split(')')[0].strip('"') if style and 'url(' in style else None
-                    
-                    dic = {
-                        "details": details,
-                        "price": price,
-                        "address": address,
-                        "number_of_rooms": number_of_rooms,
-                        "image_link": image_link
-                    }
-                    data.append(dic)
-                except Exception as e:
-                    # print(f"Error on detail page: {e}") # For debugging
-                    pass
-            
-            DF = pd.DataFrame(data)
-            df = pd.concat([df, DF], ignore_index=True)
-            progress_bar.progress(index / num_pages)
-            time.sleep(1) # Be gentle with the website
-            
-        except Exception as e:
-            st.error(f"❌ Error scraping page {index}: {str(e)}")
-    
-    df = df.drop_duplicates()
-    status_text.text("✅ Scraping completed successfully!")
-    return df
+# Scrape jobs run in a background worker, so they survive reruns, page changes and closed tabs.
+# One worker per server process is shared by every session; with COINAFRICA_WORKER=external
+# the jobs are left to a separate `python worker.py`.
+@st.cache_resource
+def background_worker():
+    return ScrapeWorker().start()
 
-# Scraping function for terrains
-def scrape_terrains(num_pages):
-    df = pd.DataFrame()
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
-    for index in range(1, num_pages + 1):
-        status_text.text(f"🔍 Scraping page {index}/{num_pages}...")
-        url = f'https://sn.coinafrique.com/categorie/terrains?page={index}'
-        
-        try:
-            res = get(url, timeout=10)
-            soup = bs(res.content, 'html.parser')
-            containers = soup.find_all('div', class_='col s6 m4 l3')
-            
-            data = []
-            for container in containers:
-                try:
-                    href = container.find('a')["href"]
-                    container_url = href if href.startswith('http') else "https://sn.coinafrique.com" + href
-                    res_container = get(container_url, timeout=10)
-                    soup_container = bs(res_container.content, "html.parser")
-                    
-                    details = soup_container.find('h1', "title title-ad hide-on-large-and-down").text
-                    # For terrains, the surface might be in the title (details) or in characteristics
-                    # We will keep using details as the surface field for simplicity as per the original code logic
-                    surface = details.strip() 
-                    
-                    price_tag = soup_container.find('p', "price")
-                    price = "".join(price_tag.text.strip().split()).replace('CFA', '') if price_tag else None
-                    
-                    # Assuming address is the first 'valign-wrapper' for terrains
-                    address_tags = soup_container.find_all('span', 'valign-wrapper')
-                    address = address_tags[0].text.strip() if len(address_tags) > 0 else None
-                    
-                    img = soup_container.find('div', class_="swiper-slide slide-clickable")
-                    style = img.get('style') if img else ''
-                    image_link = style.split('url(')[1].split(')')[0].strip('"') if style and 'url(' in style else None
-                    
-                    dic = {
-                        "details": details,
-                        "price": price,
-                        "address": address,
-                        "surface": surface,
-                        "image_link": image_link
-                    }
-                    data.append(dic)
-                except:
-                    pass
-            
-            DF = pd.DataFrame(data)
-            df = pd.concat([df, DF], ignore_index=True)
-            progress_bar.progress(index / num_pages)
-            time.sleep(1)
-            
-        except Exception as e:
-            st.error(f"❌ Error scraping page {index}: {str(e)}")
-    
-    df = df.drop_duplicates()
-    status_text.text("✅ Scraping completed successfully!")
-    return df
+if os.environ.get("COINAFRICA_WORKER") != "external":
+    background_worker()
 
-# Scraping function for apartments
-def scrape_apartments(num_pages):
-    df = pd.DataFrame()
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
-    for index in range(1, num_pages + 1):
-        status_text.text(f"🔍 Scraping page {index}/{num_pages}...")
-        url = f'https://sn.coinafrique.com/categorie/appartements?page={index}'
-        
-        try:
-            res = get(url, timeout=10)
-            soup = bs(res.content, 'html.parser')
-            containers = soup.find_all('div', class_='col s6 m4 l3')
-            
-            data = []
-            for container in containers:
-                try:
-                    href = container.find('a')["href"]
-                    container_url = href if href.startswith('http') else "https://sn.coinafrique.com" + href
-                    res_container = get(container_url, timeout=10)
-                    soup_container = bs(res_container.content, "html.parser")
-                    
-                    details = soup_container.find('h1', "title title-ad hide-on-large-and-down").text
-                    
-                    price_tag = soup_container.find('p', "price")
-                    price = "".join(price_tag.text.strip().split()).replace('CFA', '') if price_tag else None
-                    
-                    # Assuming address is the second 'valign-wrapper' for apartments
-                    address_tags = soup_container.find_all('span', 'valign-wrapper')
-                    address = address_tags[1].text.strip() if len(address_tags) > 1 else None
-                    
-                    # Finding number of rooms
-                    a_details = soup_container.find_all('div', class_="details-characteristics")[0] if soup_container.find_all('div', class_="details-characteristics") else None
-                    j = a_details.find_all('span', 'qt') if a_details else []
-                    # First 'qt' element is often the number of rooms/pieces
-                    number_of_rooms = j[0].text.strip() if len(j) > 0 else None
-                    
-                    img = soup_container.find('div', class_="swiper-slide slide-clickable")
-                    style = img.get('style') if img else ''
-                    image_link = style.split('url(')[1].split(')')[0].strip('"') if style and 'url(' in style else None
-                    
-                    dic = {
-                        "details": details,
-                        "price": price,
-                        "address": address,
-                        "number_of_rooms": number_of_rooms,
-                        "image_link": image_link
-                    }
-                    data.append(dic)
-                except:
-                    pass
-            
-            DF = pd.DataFrame(data)
-            df = pd.concat([df, DF], ignore_index=True)
-            progress_bar.progress(index / num_pages)
-            time.sleep(1)
-            
-        except Exception as e:
-            st.error(f"❌ Error scraping page {index}: {str(e)}")
-    
-    df = df.drop_duplicates()
-    status_text.text("✅ Scraping completed successfully!")
-    return df
+# Live counters and stage timings of a scrape run (metrics.RunMetrics.snapshot)
+def show_run_metrics(metrics):
+    counters = metrics["counters"]
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("⚡ Listings/s", f"{metrics['listings_per_sec']:.1f}")
+    with col2:
+        st.metric("✅ Listings", counters.get("listings", 0))
+    with col3:
+        st.metric("❌ Failed", counters.get("failed_listings", 0) + counters.get("failed_pages", 0))
+    with col4:
+        st.metric("📦 Downloaded", f"{counters.get('bytes', 0) / 1e6:.1f} MB", f"{counters.get('retries', 0)} retries", delta_color="off")
+    stages = pd.DataFrame.from_dict(metrics["stages"], orient="index")
+    total = stages["seconds"].sum()
+    stages["share"] = (stages["seconds"] / (total or 1)).map("{:.0%}".format)
+    st.dataframe(stages, use_container_width=True)
+    if metrics["bottleneck"]:
+        st.caption(f"⏱️ Most time spent in **{metrics['bottleneck']}** (stage times are summed over the fetch threads)")
+    if metrics["failures"]:
+        st.caption(" • ".join(f"{reason} ×{count}" for reason, count in metrics["failures"].items()))
+
+# Counters of the worker's HTTP client, rate limiter and response cache saved with a job
+# (worker.client_stats)
+def show_client_stats(stats):
+    if "http" in stats:
+        http_stats = stats["http"]
+        st.caption(
+            f"🌐 {http_stats['requests']} requests • {http_stats['errors']} failed • "
+            f"{http_stats['retries']} retries • avg {http_stats['avg_time']:.2f}s • "
+            f"{http_stats['bytes'] / 1e6:.1f} MB downloaded"
+        )
+    if "limiter" in stats:
+        limiter_stats = stats["limiter"]
+        st.caption(
+            f"🚦 Rate: {limiter_stats['rate']:.1f} req/s • {limiter_stats['slowdowns']} slowdowns • "
+            f"{limiter_stats['waited']:.1f}s spent waiting for the limiter"
+        )
+    if "cache" in stats:
+        cache_stats = stats["cache"]
+        st.caption(
+            f"🗄️ Cache: {cache_stats['hits']} hits • {cache_stats['revalidated']} revalidated (304) • "
+            f"{cache_stats['misses']} misses • {cache_stats['hit_ratio']:.0%} hit ratio • "
+            f"{cache_stats['evictions']} evicted"
+        )
+    if stats.keys() & {"http", "limiter", "cache"}:
+        st.caption("Client counters are shared by the jobs of the worker, since it started")
+
+# Pages of a job, e.g. "pages 1–3"
+def job_pages(job):
+    return f"pages {job['start_page'] or 1}–{job['target_pages']}"
 
-# Function to save to database
-def save_to_db(df, table_name):
-    conn = sqlite3.connect('coinafrica.db')
-    df['scraped_date'] = datetime.now()
-    df.to_sql(table_name, conn, if_exists='append', index=False)
-    conn.close()
+# Progress of the queued and running jobs (polled, so only their counters are sent)
+def show_active_jobs():
+    active, _ = recent_jobs(limit=0)
+    if active:
+        st.markdown("### ⏳ Scrape jobs in progress")
+    for job in active:
+        spec = CATEGORIES[job["category"]]
+        first = job["start_page"] or 1
+        done = max(0, job["pages_completed"] - first + 1)
+        total = max(1, job["target_pages"] - first + 1)
+        label = "⏸️ queued" if job["status"] == "queued" else f"🔍 page {min(done + 1, total)}/{total}"
+        st.markdown(f"**#{job['id']} {spec.label}** — {job_pages(job)} • {label} (updated {job['updated_at'][11:19]})")
+        st.progress(min(done / total, 1.0))
+        if job["stats"] and job["stats"].get("metrics"):
+            show_run_metrics(job["stats"]["metrics"])
+            show_client_stats(job["stats"])
+    return bool(active)
 
-# Function to load from database
-def load_from_db(table_name):
-    conn = sqlite3.connect('coinafrica.db')
-    df = pd.read_sql(f'SELECT * FROM {table_name}', conn)
-    conn.close()
-    return df
+# Results of the last finished jobs: counts and metrics, the scraped rows only on request
+def show_finished_jobs():
+    _, finished = recent_jobs()
+    if finished:
+        st.markdown("### 📋 Recent scrape jobs")
+    for job in finished:
+        spec = CATEGORIES[job["category"]]
+        run_stats = job["stats"] or {}
+        saved = f" • {run_stats['saved']} saved" if "saved" in run_stats else ""
+        with st.expander(f"#{job['id']} {spec.label} — {job_pages(job)} • {job['status']}{saved} ({job['updated_at'][:16]})"):
+            if job["error"]:
+                st.error(f"❌ Scraping stopped: {job['error']}. Use ♻️ Resume above to continue.")
+            if "saved" in run_stats:
+                key = f"job_{job['id']}"
+                show_run_results(spec, run_stats, key=key)
+                if st.toggle("🔎 Show the scraped rows", key=f"show_rows_{key}"):
+                    show_run_rows(spec, load_run(spec.table, run_stats["scraped_date"]), key=key)
+
+# Summary and run report of one category's run
+def show_run_results(spec, run_stats, key=None):
+    key = key or spec.key
+    st.success(f"✅ {run_stats['saved']} {spec.key} scraped and saved!")
+    if run_stats["skipped"]:
+        st.info(f"⏭️ {run_stats['skipped']} listings already known were skipped")
+    if run_stats["status"] == "partial":
+        st.warning(
+            f"⚠️ {run_stats['failed_urls']} listings and {run_stats['failed_pages']} pages failed. "
+            "Use ♻️ Resume above to retry only those."
+        )
+    if run_stats.get("metrics"):
+        show_run_metrics(run_stats["metrics"])
+    show_client_stats(run_stats)
+    st.download_button(
+        label="📥 Download run report (JSON)",
+        data=json.dumps(run_report([{"category": spec.key, **run_stats}]), indent=2, default=str),
+        file_name=f'{spec.key}_run_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json',
+        mime='application/json',
+        key=f"run_report_{key}"
+    )
+
+# Preview and download of the rows written by one category's run
+def show_run_rows(spec, df, key=None):
+    key = key or spec.key
+    st.dataframe(df, use_container_width=True)
+    
+    csv = df.to_csv(index=False).encode('utf-8')
+    st.download_button(
+        label="📥 Download data (CSV)",
+        data=csv,
+        file_name=f'{spec.key}_scraped_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
+        mime='text/csv',
+        use_container_width=True,
+        key=f"scraped_csv_{key}"
+    )
+
+# Bar chart of pre-computed histogram bins (left, right, listings), bins may differ in width
+def histogram_chart(bins, title, label, color):
+    fig = go.Figure(go.Bar(
+        x=(bins['left'] + bins['right']) / 2,
+        y=bins['listings'],
+        width=bins['right'] - bins['left'],
+        marker_color=color,
+        customdata=bins[['left', 'right']],
+        hovertemplate="%{customdata[0]:,.0f} – %{customdata[1]:,.0f}: %{y}<extra></extra>"
+    ))
+    fig.update_layout(title=title, xaxis_title=label, yaxis_title='count', bargap=0)
+    return fig
 
 # Sidebar navigation
 st.sidebar.markdown("# 🗂️ Navigation")
@@ -400,6 +313,17 @@ st.sidebar.markdown("---")
 st.sidebar.markdown("### 📌 Info")
 st.sidebar.info("Real estate data scraping and analysis application for Coinafrica Senegal")
 
+# Opt-in profiling of the page rerun: time and memory per stage, optionally a cProfile dump
+with st.sidebar.expander("⏱️ Profiling"):
+    profile_page = st.checkbox("Profile this page", value=False)
+    use_cprofile = st.checkbox("Record cProfile data", value=False, disabled=not profile_page)
+interrupted = st.session_state.pop("render_profiler", None)
+if interrupted is not None:
+    interrupted.stop()
+profiler = RenderProfiler(page, enabled=profile_page, cprofile=use_cprofile).start("header")
+if profiler.enabled:
+    st.session_state["render_profiler"] = profiler
+
 # Home page
 if page == "🏠 Home":
     st.markdown("""
@@ -414,6 +338,7 @@ if page == "🏠 Home":
     st.markdown("<br>", unsafe_allow_html=True)
     
     # Category cards
+    profiler.stage("category cards")
     col1, col2, col3 = st.columns(3)
     
     with col1:
@@ -464,6 +389,7 @@ if page == "🏠 Home":
     st.markdown("<br><br>", unsafe_allow_html=True)
     
     # Features section
+    profiler.stage("features")
     st.markdown('<h2 class="section-header">🎯 Main Features</h2>', unsafe_allow_html=True)
     
     col1, col2 = st.columns(2)
@@ -513,57 +439,100 @@ elif page == "🔍 Scrape Data":
     st.markdown("""
     <div class="custom-card">
         <p style='font-size: 1.1em; color: #B8B8B8;'>
-            Select a category and the number of pages to scrape. Data will be automatically saved to the database.
+            Select one or more categories and the pages to scrape. Jobs run in the background: you can leave this page while they are saved to the database.
         </p>
     </div>
     """, unsafe_allow_html=True)
     
-    col1, col2 = st.columns([2, 1])
+    categories = st.multiselect(
+        "🎯 Categories to scrape:",
+        [spec.label for spec in CATEGORIES.values()],
+        default=[CATEGORIES["villas"].label]
+    )
+    
+    # Page range of each selected category
+    targets = []
+    for label in categories:
+        spec = category_from_label(label)
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            st.markdown(f"**{label}**")
+        with col2:
+            first_page = st.number_input("📄 First page:", min_value=1, max_value=50, value=1, step=1, key=f"first_page_{spec.key}")
+        with col3:
+            last_page = st.number_input("📄 Last page:", min_value=first_page, max_value=50, value=max(first_page, 3), step=1, key=f"last_page_{spec.key}")
+        targets.append(ScrapeTarget(spec, last_page, first_page))
+    
+    col1, col2 = st.columns(2)
     
     with col1:
-        category = st.selectbox(
-            "🎯 Category to scrape:",
-            ["🏡 Villas", "🏞️ Terrains", "🏢 Apartments"]
-        )
+        incremental = st.checkbox("⏭️ Skip listings already in the database", value=True)
     
     with col2:
-        num_pages = st.number_input(
-            "📄 Number of pages:",
-            min_value=1,
-            max_value=50,
-            value=3,
-            step=1
-        )
+        stop_when_known = st.checkbox("🛑 Stop at the first fully known page", value=False, disabled=not incremental)
+    
+    to_warehouse = st.checkbox("🗃️ Also write to the Parquet warehouse (columnar history for the dashboard)", value=False)
+    
+    with st.expander("🗄️ HTTP cache"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            use_cache = st.checkbox("Use the response cache", value=True)
+        with col2:
+            cache_ttl_hours = st.number_input("Freshness (hours)", min_value=0.0, value=response_cache.ttl / 3600, step=1.0)
+        with col3:
+            offline = st.checkbox("Offline replay (cache only)", value=False, disabled=not use_cache)
+        st.caption(f"💽 {response_cache.size() / 1e6:.1f} MB cached (limit {response_cache.max_bytes / 1e6:.0f} MB)")
     
     st.markdown("<br>", unsafe_allow_html=True)
     
-    if st.button("🚀 START SCRAPING", type="primary", use_container_width=True):
-        with st.spinner("🔄 Scraping in progress..."):
-            if category == "🏡 Villas":
-                df = scrape_villas(num_pages)
-                save_to_db(df, 'villas')
-                st.success(f"✅ {len(df)} villas scraped and saved!")
-                
-            elif category == "🏞️ Terrains":
-                df = scrape_terrains(num_pages)
-                save_to_db(df, 'terrains')
-                st.success(f"✅ {len(df)} terrains scraped and saved!")
-                
-            else:
-                df = scrape_apartments(num_pages)
-                save_to_db(df, 'apartments')
-                st.success(f"✅ {len(df)} apartments scraped and saved!")
-                
-            st.dataframe(df, use_container_width=True)
-            
-            csv = df.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="📥 Download data (CSV)",
-                data=csv,
-                file_name=f'{category.lower()}_scraped_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
-                mime='text/csv',
-                use_container_width=True
-            )
+    # Jobs go to the queue in the database; a page range someone is already scraping is not queued twice
+    profiler.stage("scrape")
+    if st.button("🚀 START SCRAPING", type="primary", use_container_width=True, disabled=not targets):
+        options = dict(
+            incremental=incremental, stop_when_known=stop_when_known, to_warehouse=to_warehouse,
+            use_cache=use_cache, cache_ttl=cache_ttl_hours * 3600, offline=offline
+        )
+        for target in targets:
+            for job_id, first, last, created in enqueue_job(target.spec.key, target.num_pages, target.start_page, options):
+                if created:
+                    st.success(f"📨 {target.spec.label}: job #{job_id} queued for pages {first}–{last}")
+                else:
+                    st.info(f"🔁 {target.spec.label}: pages {first}–{last} are already being scraped by job #{job_id}, follow it below")
+    
+    # Interrupted jobs and jobs with failed listings can be resumed from their checkpoint
+    profiler.stage("unfinished jobs")
+    jobs = unfinished_jobs()
+    if jobs:
+        st.markdown("### ♻️ Unfinished scrape jobs")
+        for job in jobs:
+            spec = CATEGORIES[job["category"]]
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                st.markdown(
+                    f"**#{job['id']} {spec.label}** — {job['pages_completed']}/{job['target_pages']} pages • "
+                    f"{len(job['failed_urls'])} failed listings • {len(job['failed_pages'])} failed pages • "
+                    f"{job['status']} (updated {job['updated_at'][:16]})"
+                )
+            with col2:
+                resume = st.button("♻️ Resume", key=f"resume_job_{job['id']}", use_container_width=True)
+            if resume:
+                if requeue_job(job["id"]):
+                    st.success(f"📨 Job #{job['id']} queued again")
+                else:
+                    st.info(f"🔁 Job #{job['id']} is already queued or running")
+    
+    # Polled while jobs are queued or running; the whole page reruns once they are all done,
+    # which refreshes the finished jobs below
+    profiler.stage("scrape jobs")
+    polling = bool(recent_jobs(limit=0)[0])
+    
+    @st.fragment(run_every=JOB_POLL_SECONDS if polling else None)
+    def scrape_jobs_panel():
+        if not show_active_jobs() and polling:
+            st.rerun()
+    
+    scrape_jobs_panel()
+    show_finished_jobs()
 
 # CSV data page
 elif page == "📥 CSV Data":
@@ -579,56 +548,55 @@ elif page == "📥 CSV Data":
     
     data_type = st.selectbox(
         "📂 Data type:",
-        ["🏡 Villas", "🏞️ Terrains", "🏢 Apartments"]
+        [spec.label for spec in CATEGORIES.values()]
     )
     
-    file_mapping = {
-        "🏡 Villas": "data/Villas.csv",
-        "🏞️ Terrains": "data/terrains_data.csv",
-        "🏢 Apartments": "data/Apartments_data.csv"
-    }
-    
-    # Try loading data from file system first
-    file_path = file_mapping.get(data_type)
-    df = pd.DataFrame()
+    # Try loading data from file system first, then from the database (both cached between reruns)
+    spec = category_from_label(data_type)
+    file_path = CSV_FILES.get(spec.key)
     
+    profiler.stage("load")
     try:
-        if file_path and os.path.exists(file_path):
-            df = pd.read_csv(file_path)
+        df, source = load_category(spec)
+        if source == "csv":
             st.success(f"✅ File loaded: `{file_path}`")
-        else:
-             # Try loading from DB if CSV doesn't exist
-            table_mapping = {
-                "🏡 Villas": "villas",
-                "🏞️ Terrains": "terrains",
-                "🏢 Apartments": "apartments"
-            }
-            df = load_from_db(table_mapping[data_type])
-            if len(df) == 0:
-                 raise FileNotFoundError # Trigger the FileNotFoundError block if DB is also empty
+        elif len(df) == 0:
+            raise FileNotFoundError # Trigger the FileNotFoundError block if DB is also empty
 
         
+        # Canonical columns this source does not provide at all are left out of the missing-value stats
+        profiler.stage("statistics")
+        df_observed = df.dropna(axis=1, how='all')
+        duplicates = duplicate_stats(df)
+        
         # Display statistics
         col1, col2, col3, col4 = st.columns(4)
         with col1:
             st.metric("📊 Rows", df.shape[0])
         with col2:
-            st.metric("📋 Columns", df.shape[1])
+            st.metric("📋 Columns", df_observed.shape[1])
         with col3:
-            st.metric("⚠️ Missing values", df.isnull().sum().sum())
+            st.metric("⚠️ Missing values", df_observed.isnull().sum().sum())
         with col4:
-            st.metric("🔄 Duplicates", df.duplicated().sum())
+            st.metric("🔄 Duplicates", duplicates["repeated"], help="Rows of a listing (same ad id or URL) already seen above")
+        if duplicates["reposts"] or duplicates["changed"]:
+            st.caption(
+                f"🔁 {duplicates['reposts']} reposted ads (same title, price and address under a new ad id) • "
+                f"✏️ {duplicates['changed']} listings whose content changed between rows"
+            )
         
         st.markdown("<br>", unsafe_allow_html=True)
         
         # Display data preview
+        profiler.stage("preview table")
         st.markdown("### 👁️ Data Preview")
         st.dataframe(df.head(20), use_container_width=True)
         
         # Missing values visualization
-        if df.isnull().sum().sum() > 0:
+        profiler.stage("missing values chart")
+        if df_observed.isnull().sum().sum() > 0:
             st.markdown("### ⚠️ Missing values per column")
-            missing_data = df.isnull().sum()
+            missing_data = df_observed.isnull().sum()
             missing_data = missing_data[missing_data > 0].sort_values(ascending=False)
             
             fig = px.bar(
@@ -647,6 +615,7 @@ elif page == "📥 CSV Data":
             st.plotly_chart(fig, use_container_width=True)
         
         # Download button
+        profiler.stage("CSV download")
         csv = df.to_csv(index=False).encode('utf-8')
         st.download_button(
             label=f"📥 Download {data_type}",
@@ -658,13 +627,14 @@ elif page == "📥 CSV Data":
         )
         
     except FileNotFoundError:
+        profiler.stage("upload")
         st.error(f"❌ File not found: `{file_path}`")
         st.info("💡 Make sure your CSV files are in the 'data/' directory with the correct names or use the 'Scrape Data' section to generate new data.")
         
         uploaded_file = st.file_uploader("📤 Or upload your CSV file:", type=['csv'])
         
         if uploaded_file is not None:
-            df_uploaded = pd.read_csv(uploaded_file)
+            df_uploaded = load_upload(uploaded_file, spec)
             st.success("✅ File uploaded!")
             
             col1, col2, col3 = st.columns(3)
@@ -673,7 +643,7 @@ elif page == "📥 CSV Data":
             with col2:
                 st.metric("Columns", df_uploaded.shape[1])
             with col3:
-                st.metric("Missing values", df_uploaded.isnull().sum().sum())
+                st.metric("Missing values", df_uploaded.dropna(axis=1, how='all').isnull().sum().sum())
             
             st.dataframe(df_uploaded.head(10), use_container_width=True)
 
@@ -682,93 +652,91 @@ elif page == "📊 Dashboard":
     st.markdown('<h2 class="section-header">📊 Analytical Dashboard</h2>', unsafe_allow_html=True)
     
     # Data source selector
-    data_source = st.selectbox(
-        "📂 Data source:",
-        ["🏡 Villas", "🏞️ Terrains", "🏢 Apartments"]
-    )
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        data_source = st.selectbox(
+            "📂 Data source:",
+            [spec.label for spec in CATEGORIES.values()]
+        )
+    spec = category_from_label(data_source)
+    profiler.stage("load")
+    database_store = SQLStore(spec)
+    with col2:
+        storage = st.selectbox(
+            "🗃️ Storage:",
+            ["Database", "CSV export", "Parquet warehouse"],
+            # Database by default once it holds scraped listings, the CSV export otherwise
+            index=0 if database_store.summary(ListingFilter()).count else 1
+        )
     
-    # Try to load from CSV first, then from database
-    df = pd.DataFrame()
+    # Filters and aggregations run in the store: SQL for the database, pandas over the
+    # (small) CSV exports, and column-projected reads for the warehouse
+    store = None
     try:
-        file_mapping = {
-            "🏡 Villas": "data/Villas.csv",
-            "🏞️ Terrains": "data/terrains_data.csv",
-            "🏢 Apartments": "data/Apartments_data.csv"
-        }
-        # Check if file exists, if not, try DB later
-        csv_path = file_mapping.get(data_source)
-        if csv_path and os.path.exists(csv_path):
-             df = pd.read_csv(csv_path)
-             st.info("📁 Data loaded from CSV file")
-        else:
-             raise FileNotFoundError # Go to DB loading section
-             
-    except FileNotFoundError:
-        table_mapping = {
-            "🏡 Villas": "villas",
-            "🏞️ Terrains": "terrains",
-            "🏢 Apartments": "apartments"
-        }
-        df = load_from_db(table_mapping[data_source])
-        if len(df) > 0:
-            st.info("💾 Data loaded from database")
+        if storage == "Database":
+            store = database_store
+            st.info("💾 Data queried from database")
+        elif storage == "CSV export":
+            df = load_csv(spec.key)
+            if df is not None:
+                store = FrameStore(df)
+                st.info("📁 Data loaded from CSV file")
         else:
-             pass # df remains empty
-             
+            store = FrameStore(load_warehouse(spec, columns=DASHBOARD_COLUMNS))
+            st.info("🗃️ Data loaded from the Parquet warehouse")
     except Exception as e:
         st.error(f"An unexpected error occurred during data loading: {e}")
     
-    if len(df) > 0:
-        # Clean price data
-        if 'price' in df.columns:
-            # Enhanced cleaning for price (removing non-numeric characters before conversion)
-            df['price_numeric'] = df['price'].astype(str).str.replace(r'[^\d]', '', regex=True)
-            df['price_numeric'] = pd.to_numeric(df['price_numeric'], errors='coerce')
-            df = df[df['price_numeric'].notna()]
+    # Sidebar filters, applied inside every query below
+    profiler.stage("filters")
+    filters = ListingFilter()
+    if store is not None:
+        options = store.filter_options()
+        st.sidebar.markdown("### 🔎 Dashboard filters")
+        min_price = max_price = start = end = None
+        low, high = options["price"]
+        if pd.notna(low) and pd.notna(high) and high > low:
+            selected = st.sidebar.slider("💰 Price (FCFA)", float(low), float(high), (float(low), float(high)))
+            # Untouched bounds do not filter, so listings without a price stay visible
+            min_price = selected[0] if selected[0] > low else None
+            max_price = selected[1] if selected[1] < high else None
+        addresses = st.sidebar.multiselect("📍 Districts", options["addresses"])
+        first, last = options["dates"]
+        if first is not None:
+            dates = st.sidebar.date_input("📅 Scrape dates", (first, last), min_value=first, max_value=last)
+            # As with prices, only a narrowed range filters
+            if len(dates) == 2 and tuple(dates) != (first, last):
+                start, end = dates
+        filters = ListingFilter(min_price, max_price, tuple(addresses), start, end)
+    
+    profiler.stage("summary")
+    summary = store.summary(filters) if store is not None else None
+    if summary is not None and summary.count > 0:
+        has_price = summary.priced > 0
+        if has_price:
+            filters = filters.with_price()
+            summary = store.summary(filters)
         
         # Display metrics
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("📊 Total Records", len(df))
+            st.metric("📊 Total Records", summary.count)
         with col2:
-            if 'address' in df.columns:
-                st.metric("📍 Locations", df['address'].nunique())
+            st.metric("📍 Locations", summary.locations)
         
-        # --- FIX: Robust NaN Check for Avg Price ---
         with col3:
-            if 'price_numeric' in df.columns and len(df)>0:
-                avg_price = df['price_numeric'].mean()
-                if pd.isna(avg_price):
-                    st.metric("💰 Avg Price", "N/A")
-                else:
-                    st.metric("💰 Avg Price", f"{avg_price:,.0f} FCFA")
+            if has_price and pd.notna(summary.avg_price):
+                st.metric("💰 Avg Price", f"{summary.avg_price:,.0f} FCFA")
             else:
-                 st.metric("💰 Avg Price", "N/A")
+                st.metric("💰 Avg Price", "N/A")
 
-        # --- FIX: Robust NaN Check for Avg Rooms/Surface ---
         with col4:
-            if 'number_of_rooms' in df.columns and len(df)>0:
-                # Safe way to extract numeric room count and calculate mean
-                avg_rooms_series = df['number_of_rooms'].astype(str).str.extract('(\d+)').astype(float)
-                
-                avg_rooms = avg_rooms_series.mean()
-                
-                if pd.isna(avg_rooms):
-                    st.metric("🛏️ Avg Rooms", "N/A")
-                else:
-                    st.metric("🛏️ Avg Rooms", f"{avg_rooms:.1f}")
-                    
-            elif 'surface' in df.columns and data_source == "🏞️ Terrains" and len(df)>0:
-                # Assuming surface is in the format 'X m2' or just 'X' (details used as surface)
-                surface_numeric_series = df['surface'].astype(str).str.extract('(\d+)').astype(float)
-                avg_surface = surface_numeric_series.mean()
-                
-                if pd.isna(avg_surface):
-                    st.metric("📏 Avg Surface", "N/A")
-                else:
-                    st.metric("📏 Avg Surface", f"{avg_surface:,.0f} m²")
+            if pd.notna(summary.avg_rooms):
+                st.metric("🛏️ Avg Rooms", f"{summary.avg_rooms:.1f}")
+            elif pd.notna(summary.avg_surface):
+                st.metric("📏 Avg Surface", f"{summary.avg_surface:,.0f} m²")
             else:
-                 st.metric("Data Point", "N/A")
+                st.metric("Data Point", "N/A")
 
         
         st.markdown("<br>", unsafe_allow_html=True)
@@ -777,8 +745,9 @@ elif page == "📊 Dashboard":
         col1, col2 = st.columns(2)
         
         with col1:
-            if 'address' in df.columns:
-                address_counts = df['address'].value_counts().head(10)
+            profiler.stage("top locations chart")
+            address_counts = store.top_addresses(filters, limit=10)
+            if len(address_counts) > 0:
                 fig1 = px.bar(
                     x=address_counts.values,
                     y=address_counts.index,
@@ -796,17 +765,17 @@ elif page == "📊 Dashboard":
                 st.plotly_chart(fig1, use_container_width=True)
         
         with col2:
-            if 'price_numeric' in df.columns and len(df)>0 and not df['price_numeric'].empty and df['price_numeric'].max() > 0:
+            profiler.stage("distribution chart")
+            if has_price:
                 # Filter out extreme prices for a better visual distribution (e.g., top 95%)
-                price_limit = df['price_numeric'].quantile(0.95)
-                df_filtered = df[df['price_numeric'] <= price_limit]
+                price_bins = store.histogram('price_numeric', filters, q=0.95)
+                price_limit = price_bins['right'].max()
                 
-                fig2 = px.histogram(
-                    df_filtered,
-                    x='price_numeric',
+                fig2 = histogram_chart(
+                    price_bins,
                     title=f"💰 Price Distribution (up to {price_limit:,.0f} FCFA)",
-                    labels={'price_numeric': 'Price (FCFA)'},
-                    color_discrete_sequence=['#FF6B6B']
+                    label='Price (FCFA)',
+                    color='#FF6B6B'
                 )
                 fig2.update_layout(
                     paper_bgcolor='rgba(0,0,0,0)',
@@ -814,19 +783,17 @@ elif page == "📊 Dashboard":
                     font_color='#FAFAFA'
                 )
                 st.plotly_chart(fig2, use_container_width=True)
-            elif data_source == "🏞️ Terrains" and 'surface' in df.columns and len(df)>0:
+            elif pd.notna(summary.avg_surface):
                 # Alternative visualization for terrains (e.g., Surface distribution)
-                surface_numeric_series = df['surface'].astype(str).str.extract('(\d+)').astype(float).dropna()
+                surface_bins = store.histogram('surface_m2', filters, q=0.95)
                 
-                if not surface_numeric_series.empty and surface_numeric_series.max() > 0:
-                    surface_limit = surface_numeric_series.quantile(0.95)
-                    
-                    fig2_alt = px.histogram(
-                        surface_numeric_series[surface_numeric_series <= surface_limit],
-                        x=surface_numeric_series.name,
+                if len(surface_bins) > 0 and surface_bins['right'].max() > 0:
+                    surface_limit = surface_bins['right'].max()
+                    fig2_alt = histogram_chart(
+                        surface_bins,
                         title=f"📏 Surface Area Distribution (up to {surface_limit:,.0f} m²)",
-                        labels={surface_numeric_series.name: 'Surface Area (m²)'},
-                        color_discrete_sequence=['#FFE66D']
+                        label='Surface Area (m²)',
+                        color='#FFE66D'
                     )
                     fig2_alt.update_layout(
                         paper_bgcolor='rgba(0,0,0,0)',
@@ -840,12 +807,55 @@ elif page == "📊 Dashboard":
                  st.info("No price data available or cleanable to display distribution.")
 
         
+        # Price trends, from the weekly per-district rollups maintained at write time
+        profiler.stage("price trend chart")
+        if has_price:
+            trend = store.price_trend(filters)
+            if trend['week'].nunique() > 1:
+                fig3 = px.line(
+                    trend,
+                    x='week',
+                    y='median_price',
+                    color='address',
+                    markers=True,
+                    title="📈 Median Price per District per Week",
+                    labels={'week': 'Week', 'median_price': 'Median price (FCFA)', 'address': 'District'},
+                    hover_data=['listings']
+                )
+                fig3.update_layout(
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    font_color='#FAFAFA'
+                )
+                st.plotly_chart(fig3, use_container_width=True)
+        
+        profiler.stage("listing history")
+        with st.expander("🔎 Price history of a listing"):
+            ad_id = st.number_input("Ad id", min_value=0, value=0, step=1)
+            if ad_id:
+                history = store.listing_history(ad_id)
+                if len(history) > 0:
+                    st.dataframe(history, use_container_width=True)
+                else:
+                    st.info(f"No stored version of ad {ad_id}")
+        
         # Data table
+        profiler.stage("raw data table")
         st.markdown('<h3 class="section-header">Raw Data Table</h3>', unsafe_allow_html=True)
-        st.dataframe(df, use_container_width=True)
+        # Only the displayed page is queried and sent to the browser
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1)
+        page_count = max(1, -(-summary.count // page_size))
+        with col2:
+            page_number = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1)
+        offset = (page_number - 1) * page_size
+        rows = store.rows(filters, limit=page_size, offset=offset)
+        st.caption(f"Rows {offset + 1 if len(rows) else 0}–{offset + len(rows)} of {summary.count}, most recent first")
+        st.dataframe(rows, use_container_width=True)
         
     else:
-        st.warning(f"❌ No data available for {data_source} (check CSV files in 'data/' or database 'coinafrica.db').")
+        st.warning(f"❌ No data available for {data_source} (check CSV files in 'data/', database 'coinafrica.db' or the warehouse in 'data/warehouse').")
 
 # Evaluation page
 elif page == "📝 Evaluation":
@@ -959,6 +969,30 @@ elif page == "📝 Evaluation":
         </div>
         """, unsafe_allow_html=True)
 
+# Render profile of this rerun, next to the last profile of the other pages
+profiler.stop()
+st.session_state.pop("render_profiler", None)
+if profiler.enabled:
+    st.markdown('<h3 class="section-header">⏱️ Render profile</h3>', unsafe_allow_html=True)
+    profiles = st.session_state.setdefault("render_profiles", {})
+    profiles[page] = profiler.breakdown()
+    breakdown = pd.concat(profiles.values(), ignore_index=True)
+    st.dataframe(breakdown.style.format({"ms": "{:,.1f}", "allocated_mb": "{:.2f}", "peak_mb": "{:.2f}", "share": "{:.0%}"}), use_container_width=True)
+    st.caption(f"⏱️ {profiles[page]['ms'].sum():,.0f} ms for this rerun of {page} (memory traced with tracemalloc, which slows the page down)")
+    top_functions = profiler.top_functions()
+    if top_functions is not None:
+        st.markdown("**Most expensive functions (cumulative time)**")
+        st.dataframe(top_functions, use_container_width=True)
+        profile_path = profiler.dump()
+        with open(profile_path, 'rb') as f:
+            st.download_button(
+                label="📥 Download cProfile data (.prof)",
+                data=f.read(),
+                file_name=os.path.basename(profile_path),
+                mime='application/octet-stream'
+            )
+        st.caption(f"💾 Saved to `{profile_path}` — open with `snakeviz`, or `flameprof` for a flame graph")
+
 # Final footer
 st.markdown("<br><br>", unsafe_allow_html=True)
 st.markdown("---")
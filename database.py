@@ -0,0 +1,715 @@
+import json
+import sqlite3
+import statistics
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from dedup import content_hash, near_duplicate_key
+from normalize import NUMERIC_COLUMNS, normalize_frame, normalize_records
+from scraper import CATEGORIES
+
+DB_PATH = 'coinafrica.db'
+# Records written between two commits of a streaming scrape
+COMMIT_EVERY = 100
+# Seconds a connection waits for another writer's lock before failing
+BUSY_TIMEOUT = 30
+
+# Columns added to the category tables after the first release, by the migration adding them
+# (migrations are append-only: a new column set gets a new numbered migration)
+MIGRATED_COLUMNS = {
+    1: {
+        "url": "TEXT",
+        "ad_id": "INTEGER",
+        "price_numeric": "REAL",
+        "rooms": "INTEGER",
+        "bathrooms": "INTEGER",
+        "surface_m2": "REAL",
+        "price_per_m2": "REAL",
+    },
+    4: {
+        "content_hash": "TEXT",
+        "dup_key": "TEXT",
+        "duplicate_of": "INTEGER",
+        "first_seen": "TIMESTAMP",
+    },
+}
+# Columns maintained by the storage layer rather than taken from scraped records
+BOOKKEEPING_COLUMNS = ("id", "content_hash", "dup_key", "duplicate_of", "first_seen", "scraped_date")
+
+# Histogram bins of the materialized aggregates: 1 to 10^11, log-spaced
+BINS_PER_DECADE = 10
+BINNED_COLUMNS = ("price_numeric", "surface_m2")
+
+# Secondary indexes of every category table, by name suffix, created by init_database
+# (address_date also serves lookups on address alone)
+INDEXES = {
+    "scraped_date": "scraped_date",
+    "address_date": "address, scraped_date",
+    "price": "price_numeric",
+}
+
+# Columns of the job queue, added to scrape_jobs tables of older releases
+JOB_QUEUE_COLUMNS = {
+    "start_page": "INTEGER DEFAULT 1",
+    "options": "TEXT DEFAULT '{}'",
+    "worker": "TEXT",
+    "stats": "TEXT",
+    "error": "TEXT",
+}
+# Jobs waiting for or being run by a worker
+ACTIVE_JOB_STATUSES = ('queued', 'running')
+# Placeholders of ACTIVE_JOB_STATUSES in an IN (...) condition
+_ACTIVE_PLACEHOLDERS = ", ".join("?" * len(ACTIVE_JOB_STATUSES))
+# Seconds without a checkpoint after which a running job's worker is presumed dead
+STALE_JOB_AFTER = 600
+
+_local = threading.local()
+
+
+# Shared connection of the current thread to a database file, opened on first use
+# WAL journaling lets the dashboard read while a scrape is writing.
+def connect(db_path=DB_PATH):
+    connections = _local.__dict__.setdefault("connections", {})
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        connections[db_path] = conn
+    return conn
+
+
+# Schema migrations, applied in order to databases whose user_version is lower
+# Every step is idempotent, since tables created by older releases may already have part of it.
+def _add_columns(conn, version=1):
+    for spec in CATEGORIES.values():
+        existing = {row[1] for row in conn.execute(f'PRAGMA table_info({spec.table})')}
+        for column, column_type in MIGRATED_COLUMNS[version].items():
+            if column not in existing:
+                conn.execute(f'ALTER TABLE {spec.table} ADD COLUMN {column} {column_type}')
+        if not set(NUMERIC_COLUMNS) <= existing:
+            backfill_numeric(conn, spec.table)
+
+
+def _add_indexes(conn, names=tuple(INDEXES)):
+    for spec in CATEGORIES.values():
+        for name in names:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{spec.table}_{name} ON {spec.table}({INDEXES[name]})')
+
+
+def _add_date_indexes(conn):
+    _add_indexes(conn, ("scraped_date", "address_date"))
+
+
+# Price index used by the dashboard filters
+def _add_price_index(conn):
+    _add_indexes(conn, ("price",))
+
+
+# One current row per ad id, and the lookup of reposts by near-duplicate key
+# The ad_id index of releases before migration 4 was not unique: it is replaced.
+def _add_unique_keys(conn):
+    for spec in CATEGORIES.values():
+        unique = {row[1]: row[2] for row in conn.execute(f'PRAGMA index_list({spec.table})')}
+        if unique.get(f'idx_{spec.table}_ad_id') == 0:
+            conn.execute(f'DROP INDEX idx_{spec.table}_ad_id')
+        conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS idx_{spec.table}_ad_id ON {spec.table}(ad_id)')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{spec.table}_dup_key ON {spec.table}(dup_key)')
+
+
+# Collapse the snapshots appended by older releases into one current row per ad id
+# The rows are replayed in insertion order through store_listing, which records every content
+# change in listing_history; ad_id becomes unique afterwards.
+def _deduplicate_listings(conn):
+    _add_columns(conn, 4)
+    for spec in CATEGORIES.values():
+        df = pd.read_sql(f'SELECT * FROM {spec.table} ORDER BY id', conn)
+        conn.execute(f'DELETE FROM {spec.table}')
+        conn.execute('DELETE FROM listing_history WHERE table_name = ?', (spec.table,))
+        for record in df.astype(object).where(df.notna(), None).to_dict('records'):
+            scraped_date = record["scraped_date"] or str(datetime.now())
+            store_listing(conn, spec.table, record, scraped_date)
+    _add_unique_keys(conn)
+
+
+# Price observations collected before the rollup tables existed: every stored version of a
+# listing, and its current row (last seen)
+def _build_price_rollups(conn):
+    for spec in CATEGORIES.values():
+        observations = conn.execute(
+            'SELECT ad_id, address, price_numeric, scraped_date FROM listing_history WHERE table_name = ? '
+            f'UNION ALL SELECT ad_id, address, price_numeric, scraped_date FROM {spec.table} ORDER BY scraped_date',
+            (spec.table,)
+        ).fetchall()
+        groups = set()
+        for ad_id, address, price, scraped_date in observations:
+            groups |= record_price(conn, spec.table, {"ad_id": ad_id, "address": address, "price_numeric": price}, scraped_date)
+        refresh_rollups(conn, spec.table, groups)
+
+
+# Materialized dashboard aggregates of every category table, kept current by triggers
+#   category_summary  counts and sums of the numeric columns, over all listings and over priced ones
+#   address_counts    listings per district (same two scopes)
+#   value_bins        log-spaced histogram bins of price_numeric and surface_m2
+# Reading them costs the same whatever the table size. With rebuild=False (every init_database),
+# only tables without aggregates yet are counted, e.g. a category added after migration 6.
+def _create_summaries(conn, rebuild=True):
+    conn.executemany(
+        'INSERT OR IGNORE INTO bin_edges (bin, lower) VALUES (?, ?)',
+        [(0, 0.0)] + [(index + 1, 10 ** (index / BINS_PER_DECADE)) for index in range(BINS_PER_DECADE * 11)]
+    )
+    for spec in CATEGORIES.values():
+        for event, changes in (("INSERT", (("NEW", 1),)), ("DELETE", (("OLD", -1),)),
+                               ("UPDATE OF address, price_numeric, rooms, surface_m2", (("OLD", -1), ("NEW", 1)))):
+            body = "".join(_summary_delta(spec.table, row, sign) for row, sign in changes)
+            name = event.split()[0].lower()
+            conn.execute(f'CREATE TRIGGER IF NOT EXISTS trg_{spec.table}_summary_{name} AFTER {event} ON {spec.table} BEGIN {body} END')
+
+        # Current rows, counted once
+        if not rebuild and conn.execute('SELECT 1 FROM category_summary WHERE table_name = ?', (spec.table,)).fetchone():
+            continue
+        conn.execute('DELETE FROM category_summary WHERE table_name = ?', (spec.table,))
+        conn.execute('DELETE FROM address_counts WHERE table_name = ?', (spec.table,))
+        conn.execute('DELETE FROM value_bins WHERE table_name = ?', (spec.table,))
+        for scope, condition in (("all", ""), ("priced", " WHERE price_numeric IS NOT NULL")):
+            conn.execute(
+                'INSERT INTO category_summary SELECT ?, ?, COUNT(*), COUNT(price_numeric), COALESCE(SUM(price_numeric), 0), '
+                'COUNT(rooms), COALESCE(SUM(rooms), 0), COUNT(surface_m2), COALESCE(SUM(surface_m2), 0) '
+                f'FROM {spec.table}{condition}',
+                (spec.table, scope)
+            )
+            conn.execute(
+                f'INSERT INTO address_counts SELECT ?, ?, address, COUNT(*) FROM {spec.table}{condition} '
+                f'{"AND" if condition else "WHERE"} address IS NOT NULL GROUP BY address',
+                (spec.table, scope)
+            )
+        for column in BINNED_COLUMNS:
+            conn.execute(
+                f'INSERT INTO value_bins SELECT ?, ?, (SELECT MAX(bin) FROM bin_edges WHERE lower <= {column}) AS bin, COUNT(*) '
+                f'FROM {spec.table} WHERE {column} IS NOT NULL GROUP BY bin',
+                (spec.table, column)
+            )
+
+
+# Trigger statements adding (sign 1) or removing (sign -1) one row of a table from its aggregates
+def _summary_delta(table_name, row, sign):
+    priced = f"{row}.price_numeric IS NOT NULL"
+    statements = [
+        f"""UPDATE category_summary SET
+              listings = listings + {sign},
+              price_count = price_count + {sign} * ({row}.price_numeric IS NOT NULL),
+              price_sum = price_sum + {sign} * COALESCE({row}.price_numeric, 0),
+              rooms_count = rooms_count + {sign} * ({row}.rooms IS NOT NULL),
+              rooms_sum = rooms_sum + {sign} * COALESCE({row}.rooms, 0),
+              surface_count = surface_count + {sign} * ({row}.surface_m2 IS NOT NULL),
+              surface_sum = surface_sum + {sign} * COALESCE({row}.surface_m2, 0)
+            WHERE table_name = '{table_name}' AND (scope = 'all' OR {priced})""",
+        f"""INSERT INTO address_counts (table_name, scope, address, listings)
+            SELECT '{table_name}', scope, {row}.address, {sign}
+            FROM (SELECT 'all' AS scope UNION ALL SELECT 'priced' WHERE {priced})
+            WHERE {row}.address IS NOT NULL
+            ON CONFLICT (table_name, scope, address) DO UPDATE SET listings = listings + excluded.listings""",
+        f"DELETE FROM address_counts WHERE table_name = '{table_name}' AND address = {row}.address AND listings <= 0",
+    ]
+    for column in BINNED_COLUMNS:
+        statements.append(
+            f"""INSERT INTO value_bins (table_name, column_name, bin, listings)
+                SELECT '{table_name}', '{column}', (SELECT MAX(bin) FROM bin_edges WHERE lower <= {row}.{column}), {sign}
+                WHERE {row}.{column} IS NOT NULL
+                ON CONFLICT (table_name, column_name, bin) DO UPDATE SET listings = listings + excluded.listings"""
+        )
+    return "".join(statement + ";\n" for statement in statements)
+
+
+# Queue columns of scrape_jobs (see enqueue_job and claim_job)
+def _add_job_queue_columns(conn):
+    existing = {row[1] for row in conn.execute('PRAGMA table_info(scrape_jobs)')}
+    for column, column_type in JOB_QUEUE_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f'ALTER TABLE scrape_jobs ADD COLUMN {column} {column_type}')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_scrape_jobs_status ON scrape_jobs (status, category)')
+    # Jobs still running before the queue existed were run in-process and died with it
+    conn.execute("UPDATE scrape_jobs SET status = 'interrupted' WHERE status = 'running'")
+
+
+MIGRATIONS = (
+    (1, _add_columns),
+    (2, _add_date_indexes),
+    (3, _add_price_index),
+    (4, _deduplicate_listings),
+    (5, _build_price_rollups),
+    (6, _create_summaries),
+    (7, _add_job_queue_columns),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+# SQLite database connection
+def init_database(db_path=DB_PATH):
+    conn = connect(db_path)
+    c = conn.cursor()
+
+    # One table per category (villas, terrains, apartments, ...)
+    for spec in CATEGORIES.values():
+        c.execute(f'''CREATE TABLE IF NOT EXISTS {spec.table}
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  details TEXT,
+                  price TEXT,
+                  address TEXT,
+                  {spec.extra_field} TEXT,
+                  image_link TEXT,
+                  url TEXT,
+                  ad_id INTEGER,
+                  price_numeric REAL,
+                  rooms INTEGER,
+                  bathrooms INTEGER,
+                  surface_m2 REAL,
+                  price_per_m2 REAL,
+                  content_hash TEXT,
+                  dup_key TEXT,
+                  duplicate_of INTEGER,
+                  first_seen TIMESTAMP,
+                  scraped_date TIMESTAMP)''')
+
+    # Scrape jobs and their checkpoints, used to resume interrupted scrapes
+    c.execute('''CREATE TABLE IF NOT EXISTS scrape_jobs
+             (id INTEGER PRIMARY KEY AUTOINCREMENT,
+              category TEXT,
+              target_pages INTEGER,
+              pages_completed INTEGER DEFAULT 0,
+              failed_urls TEXT DEFAULT '[]',
+              failed_pages TEXT DEFAULT '[]',
+              status TEXT DEFAULT 'running',
+              created_at TIMESTAMP,
+              updated_at TIMESTAMP,
+              start_page INTEGER DEFAULT 1,
+              options TEXT DEFAULT '{}',
+              worker TEXT,
+              stats TEXT,
+              error TEXT)''')
+
+    # Write counter per table, used by the loading layer to invalidate cached frames
+    c.execute('''CREATE TABLE IF NOT EXISTS data_versions
+             (table_name TEXT PRIMARY KEY,
+              version INTEGER DEFAULT 0)''')
+
+    # Every version of every listing: a row per new listing or content change
+    c.execute('''CREATE TABLE IF NOT EXISTS listing_history
+             (id INTEGER PRIMARY KEY AUTOINCREMENT,
+              table_name TEXT,
+              ad_id INTEGER,
+              url TEXT,
+              content_hash TEXT,
+              details TEXT,
+              price TEXT,
+              price_numeric REAL,
+              address TEXT,
+              scraped_date TIMESTAMP)''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_listing_history_ad_id ON listing_history(table_name, ad_id, scraped_date)')
+
+    # Latest price of each listing per week, and per-district weekly rollups maintained from it
+    c.execute('''CREATE TABLE IF NOT EXISTS weekly_prices
+             (table_name TEXT,
+              ad_id INTEGER,
+              week TEXT,
+              address TEXT,
+              price_numeric REAL,
+              PRIMARY KEY (table_name, ad_id, week))''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_weekly_prices_group ON weekly_prices(table_name, address, week)')
+    c.execute('''CREATE TABLE IF NOT EXISTS price_rollups
+             (table_name TEXT,
+              address TEXT,
+              week TEXT,
+              listings INTEGER,
+              median_price REAL,
+              mean_price REAL,
+              min_price REAL,
+              max_price REAL,
+              PRIMARY KEY (table_name, address, week))''')
+
+    # Materialized dashboard aggregates (see _create_summaries)
+    c.execute('''CREATE TABLE IF NOT EXISTS category_summary
+             (table_name TEXT,
+              scope TEXT,
+              listings INTEGER DEFAULT 0,
+              price_count INTEGER DEFAULT 0,
+              price_sum REAL DEFAULT 0,
+              rooms_count INTEGER DEFAULT 0,
+              rooms_sum REAL DEFAULT 0,
+              surface_count INTEGER DEFAULT 0,
+              surface_sum REAL DEFAULT 0,
+              PRIMARY KEY (table_name, scope))''')
+    c.execute('''CREATE TABLE IF NOT EXISTS address_counts
+             (table_name TEXT,
+              scope TEXT,
+              address TEXT,
+              listings INTEGER,
+              PRIMARY KEY (table_name, scope, address))''')
+    c.execute('''CREATE TABLE IF NOT EXISTS value_bins
+             (table_name TEXT,
+              column_name TEXT,
+              bin INTEGER,
+              listings INTEGER,
+              PRIMARY KEY (table_name, column_name, bin))''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_address_counts_rank ON address_counts(table_name, scope, listings)')
+    c.execute('CREATE TABLE IF NOT EXISTS bin_edges (bin INTEGER PRIMARY KEY, lower REAL)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_bin_edges_lower ON bin_edges(lower)')
+
+    # Upgrade databases created by older releases
+    version = c.execute('PRAGMA user_version').fetchone()[0]
+    for target, migrate in MIGRATIONS:
+        if version < target:
+            migrate(conn)
+            c.execute(f'PRAGMA user_version = {target}')
+
+    # Indexes of every category table, including tables added after the migrations ran
+    # (created once the migrations have added the columns they cover)
+    _add_indexes(conn)
+    _add_unique_keys(conn)
+    # Aggregate triggers and rows of every category table
+    _create_summaries(conn, rebuild=False)
+
+    conn.commit()
+
+
+# Store one scraped listing as the current row of its ad id
+# Returns "new", "changed" (content hash differs from the current row, which is updated) or
+# "unchanged" (only the last-seen date moves). New and changed listings get a history row.
+# A new ad whose near-duplicate key matches an existing listing is marked as its repost.
+def store_listing(conn, table_name, record, scraped_date):
+    record = {key: value for key, value in record.items() if key not in BOOKKEEPING_COLUMNS}
+    record.update(content_hash=content_hash(record), dup_key=near_duplicate_key(record))
+    current = None
+    if record.get("ad_id") is not None:
+        current = conn.execute(f'SELECT id, content_hash FROM {table_name} WHERE ad_id = ?', (record["ad_id"],)).fetchone()
+
+    if current is not None and current[1] == record["content_hash"]:
+        conn.execute(f'UPDATE {table_name} SET scraped_date = ? WHERE id = ?', (scraped_date, current[0]))
+        return "unchanged"
+    if current is not None:
+        assignments = ", ".join(f"{column} = ?" for column in record)
+        conn.execute(
+            f'UPDATE {table_name} SET {assignments}, scraped_date = ? WHERE id = ?',
+            (*record.values(), scraped_date, current[0])
+        )
+        status = "changed"
+    else:
+        original = None
+        if record["dup_key"] is not None:
+            original = conn.execute(
+                f'SELECT COALESCE(duplicate_of, ad_id) FROM {table_name} WHERE dup_key = ? AND ad_id IS NOT ? ORDER BY id LIMIT 1',
+                (record["dup_key"], record.get("ad_id"))
+            ).fetchone()
+        record["duplicate_of"] = original[0] if original else None
+        columns = (*record, "first_seen", "scraped_date")
+        conn.execute(
+            f'INSERT INTO {table_name} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})',
+            (*record.values(), scraped_date, scraped_date)
+        )
+        status = "new"
+
+    conn.execute(
+        'INSERT INTO listing_history (table_name, ad_id, url, content_hash, details, price, price_numeric, address, scraped_date) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (table_name, *(record.get(column) for column in ("ad_id", "url", "content_hash", "details", "price", "price_numeric", "address")), scraped_date)
+    )
+    return status
+
+
+# Monday of the week of a scrape timestamp, as YYYY-MM-DD
+def week_of(scraped_date):
+    day = datetime.fromisoformat(str(scraped_date)).date()
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+
+# Record the price of a listing for the week of scraped_date (the latest observation of a week wins)
+# Returns the (address, week) rollup groups to refresh.
+def record_price(conn, table_name, record, scraped_date):
+    ad_id = record.get("ad_id")
+    if ad_id is None:
+        return set()
+    week = week_of(scraped_date)
+    groups = {(record.get("address"), week)}
+    previous = conn.execute(
+        'SELECT address FROM weekly_prices WHERE table_name = ? AND ad_id = ? AND week = ?', (table_name, ad_id, week)
+    ).fetchone()
+    if previous is not None:
+        groups.add((previous[0], week))
+    conn.execute(
+        'INSERT OR REPLACE INTO weekly_prices (table_name, ad_id, week, address, price_numeric) VALUES (?, ?, ?, ?, ?)',
+        (table_name, ad_id, week, record.get("address"), record.get("price_numeric"))
+    )
+    return groups
+
+
+# Recompute the weekly rollups of the given (address, week) groups from their listing prices
+def refresh_rollups(conn, table_name, groups):
+    for address, week in groups:
+        prices = [row[0] for row in conn.execute(
+            'SELECT price_numeric FROM weekly_prices WHERE table_name = ? AND address IS ? AND week = ? '
+            'AND price_numeric IS NOT NULL',
+            (table_name, address, week)
+        )]
+        if not prices:
+            conn.execute('DELETE FROM price_rollups WHERE table_name = ? AND address IS ? AND week = ?', (table_name, address, week))
+            continue
+        conn.execute(
+            'INSERT OR REPLACE INTO price_rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (table_name, address, week, len(prices), statistics.median(prices), statistics.fmean(prices), min(prices), max(prices))
+        )
+
+
+# Stream batches of records (lists of dicts) into a table with periodic commits
+# Rows already committed are kept if the scrape fails midway. Returns the number of rows written.
+# Each commit group takes the write lock before its first read (BEGIN IMMEDIATE): two jobs
+# saving the same ad id at the same time then update one row instead of both inserting it.
+def write_batches(table_name, batches, scraped_date=None, commit_every=COMMIT_EVERY, db_path=DB_PATH):
+    scraped_date = str(scraped_date or datetime.now())
+    conn = connect(db_path)
+    written = 0
+    pending = 0
+    groups = set()
+    try:
+        for batch in batches:
+            if not conn.in_transaction:
+                conn.execute('BEGIN IMMEDIATE')
+            for record in normalize_records(batch):
+                store_listing(conn, table_name, record, scraped_date)
+                groups |= record_price(conn, table_name, record, scraped_date)
+                written += 1
+                pending += 1
+            if pending >= commit_every:
+                refresh_rollups(conn, table_name, groups)
+                _bump_version(conn, table_name)
+                conn.commit()
+                pending = 0
+                groups = set()
+    finally:
+        if pending:
+            refresh_rollups(conn, table_name, groups)
+            _bump_version(conn, table_name)
+        conn.commit()
+    return written
+
+
+def _bump_version(conn, table_name):
+    conn.execute(
+        'INSERT INTO data_versions (table_name, version) VALUES (?, 1) '
+        'ON CONFLICT(table_name) DO UPDATE SET version = version + 1',
+        (table_name,)
+    )
+
+
+# Current write counter of a table (changes whenever rows are saved)
+def table_version(table_name, db_path=DB_PATH):
+    row = connect(db_path).execute('SELECT version FROM data_versions WHERE table_name = ?', (table_name,)).fetchone()
+    return row[0] if row else 0
+
+
+# Parse the numeric columns of rows stored before ingest-time normalization existed
+def backfill_numeric(conn, table_name):
+    df = pd.read_sql(f'SELECT * FROM {table_name}', conn)
+    if df.empty:
+        return
+    df = normalize_frame(df.drop(columns=[column for column in NUMERIC_COLUMNS if column in df.columns]))
+    columns = [column for column in NUMERIC_COLUMNS if column in df.columns]
+    if not columns:
+        return
+    values = df[columns].astype(object).where(df[columns].notna(), None)
+    assignments = ", ".join(f"{column} = ?" for column in columns)
+    conn.executemany(
+        f'UPDATE {table_name} SET {assignments} WHERE id = ?',
+        [(*row, row_id) for row, row_id in zip(values.itertuples(index=False), df['id'])]
+    )
+
+
+# Function to load from database
+# address and the scraped_date bounds (inclusive) are answered by the table indexes
+def load_from_db(table_name, address=None, start=None, end=None, db_path=DB_PATH):
+    conditions, params = [], []
+    if address is not None:
+        conditions.append('address = ?')
+        params.append(address)
+    if start is not None:
+        conditions.append('scraped_date >= ?')
+        params.append(str(start))
+    if end is not None:
+        conditions.append('scraped_date <= ?')
+        params.append(str(end))
+    where = f' WHERE {" AND ".join(conditions)}' if conditions else ''
+    return pd.read_sql(f'SELECT * FROM {table_name}{where}', connect(db_path), params=params)
+
+
+# Return the subset of ad_ids already stored in a table
+def known_ad_ids(table_name, ad_ids, db_path=DB_PATH):
+    ad_ids = [ad_id for ad_id in ad_ids if ad_id is not None]
+    if not ad_ids:
+        return set()
+    conn = connect(db_path)
+    placeholders = ",".join("?" * len(ad_ids))
+    rows = conn.execute(f'SELECT DISTINCT ad_id FROM {table_name} WHERE ad_id IN ({placeholders})', ad_ids).fetchall()
+    return {row[0] for row in rows}
+
+
+# Rows written by one scrape run
+def load_run(table_name, scraped_date, db_path=DB_PATH):
+    return pd.read_sql(f'SELECT * FROM {table_name} WHERE scraped_date = ?', connect(db_path), params=(str(scraped_date),))
+
+
+# Create a scrape job for pages start_page..target_pages and return its id
+def create_job(category, target_pages, db_path=DB_PATH, start_page=1, status='running', options=None):
+    conn = connect(db_path)
+    job_id = _insert_job(conn, category, target_pages, start_page, status, options)
+    conn.commit()
+    return job_id
+
+
+def _insert_job(conn, category, target_pages, start_page, status, options):
+    now = str(datetime.now())
+    cursor = conn.execute(
+        'INSERT INTO scrape_jobs (category, target_pages, pages_completed, start_page, status, options, created_at, updated_at) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        (category, target_pages, start_page - 1, start_page, status, json.dumps(options or {}), now, now)
+    )
+    return cursor.lastrowid
+
+
+# Queue scrape jobs for a background worker covering pages start_page..target_pages of a category
+# Pages an active (queued or running) job of the category already covers are left to that job,
+# so that users submitting the same scrape at the same time share it; a job is queued for each
+# range of pages no active job covers. The check and the inserts run in one write transaction,
+# which SQLite serializes across threads and processes.
+# Returns (job id, first page, last page, created) tuples covering the range in page order,
+# created being False for the parts taken by an existing job.
+def enqueue_job(category, target_pages, start_page=1, options=None, db_path=DB_PATH):
+    conn = connect(db_path)
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        active = conn.execute(
+            f"SELECT id, COALESCE(start_page, 1) AS first, target_pages FROM scrape_jobs WHERE category = ? "
+            f"AND status IN ({_ACTIVE_PLACEHOLDERS}) AND COALESCE(start_page, 1) <= ? AND target_pages >= ? ORDER BY first, id",
+            (category, *ACTIVE_JOB_STATUSES, target_pages, start_page)
+        ).fetchall()
+        jobs, page = [], start_page
+        for job_id, first, last in active:
+            if last < page:
+                continue
+            if first > page:
+                jobs.append((_insert_job(conn, category, first - 1, page, 'queued', options), page, first - 1, True))
+            jobs.append((job_id, max(first, page), min(last, target_pages), False))
+            page = last + 1
+            if page > target_pages:
+                break
+        if page <= target_pages:
+            jobs.append((_insert_job(conn, category, target_pages, page, 'queued', options), page, target_pages, True))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return jobs
+
+
+# Put an unfinished job back in the queue (False if it is already queued or running)
+def requeue_job(job_id, db_path=DB_PATH):
+    conn = connect(db_path)
+    cursor = conn.execute(
+        f"UPDATE scrape_jobs SET status = 'queued', error = NULL, updated_at = ? WHERE id = ? AND status NOT IN ({_ACTIVE_PLACEHOLDERS})",
+        (str(datetime.now()), job_id, *ACTIVE_JOB_STATUSES)
+    )
+    conn.commit()
+    return cursor.rowcount > 0
+
+
+# Hand the oldest queued job to worker and return its id (None when the queue is empty)
+# Running jobs whose worker has not checkpointed for stale_after seconds (the worker died)
+# are handed out again and resume from their last checkpoint.
+def claim_job(worker, stale_after=STALE_JOB_AFTER, db_path=DB_PATH):
+    conn = connect(db_path)
+    cutoff = str(datetime.now() - timedelta(seconds=stale_after))
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # A stalled job run outside the queue (cli.py) is left to be resumed with its own options
+        conn.execute(
+            "UPDATE scrape_jobs SET status = 'interrupted' WHERE status = 'running' AND worker IS NULL AND updated_at < ?",
+            (cutoff,)
+        )
+        row = conn.execute(
+            "SELECT id FROM scrape_jobs WHERE status = 'queued' "
+            "OR (status = 'running' AND worker IS NOT NULL AND updated_at < ?) ORDER BY id LIMIT 1",
+            (cutoff,)
+        ).fetchone()
+        if row:
+            conn.execute(
+                "UPDATE scrape_jobs SET status = 'running', worker = ?, error = NULL, updated_at = ? WHERE id = ?",
+                (worker, str(datetime.now()), row[0])
+            )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return row[0] if row else None
+
+
+# Cursor returning sqlite3.Row objects, leaving the shared connection's row factory untouched
+def _rows(db_path):
+    cursor = connect(db_path).cursor()
+    cursor.row_factory = sqlite3.Row
+    return cursor
+
+
+def _job_from_row(row):
+    job = dict(row)
+    job["failed_urls"] = json.loads(job["failed_urls"] or '[]')
+    job["failed_pages"] = json.loads(job["failed_pages"] or '[]')
+    job["options"] = json.loads(job.get("options") or '{}')
+    job["stats"] = json.loads(job["stats"]) if job.get("stats") else None
+    return job
+
+
+def get_job(job_id, db_path=DB_PATH):
+    row = _rows(db_path).execute('SELECT * FROM scrape_jobs WHERE id = ?', (job_id,)).fetchone()
+    return _job_from_row(row) if row else None
+
+
+# Jobs that were interrupted or left failed URLs behind, most recent first
+def unfinished_jobs(db_path=DB_PATH):
+    rows = _rows(db_path).execute(
+        f"SELECT * FROM scrape_jobs WHERE status != 'completed' AND status NOT IN ({_ACTIVE_PLACEHOLDERS}) ORDER BY id DESC",
+        ACTIVE_JOB_STATUSES
+    ).fetchall()
+    return [_job_from_row(row) for row in rows]
+
+
+# Queued and running jobs, oldest first, followed by the last finished ones
+def recent_jobs(limit=5, db_path=DB_PATH):
+    cursor = _rows(db_path)
+    active = cursor.execute(
+        f"SELECT * FROM scrape_jobs WHERE status IN ({_ACTIVE_PLACEHOLDERS}) ORDER BY id", ACTIVE_JOB_STATUSES
+    ).fetchall()
+    finished = cursor.execute(
+        f"SELECT * FROM scrape_jobs WHERE status NOT IN ({_ACTIVE_PLACEHOLDERS}) ORDER BY id DESC LIMIT ?", (*ACTIVE_JOB_STATUSES, limit)
+    ).fetchall()
+    return [_job_from_row(row) for row in active], [_job_from_row(row) for row in finished]
+
+
+# Save the progress of a job (stats: run counters and metrics, shown while the job runs)
+def checkpoint_job(job_id, pages_completed=None, failed_urls=None, failed_pages=None, status=None, stats=None, error=None, db_path=DB_PATH):
+    updates = {"updated_at": str(datetime.now())}
+    if pages_completed is not None:
+        updates["pages_completed"] = pages_completed
+    if failed_urls is not None:
+        updates["failed_urls"] = json.dumps(sorted(set(failed_urls)))
+    if failed_pages is not None:
+        updates["failed_pages"] = json.dumps(sorted(set(failed_pages)))
+    if status is not None:
+        updates["status"] = status
+    if stats is not None:
+        updates["stats"] = json.dumps(stats, default=str)
+    if error is not None:
+        updates["error"] = error
+    assignments = ", ".join(f"{column} = ?" for column in updates)
+    conn = connect(db_path)
+    conn.execute(f'UPDATE scrape_jobs SET {assignments} WHERE id = ?', (*updates.values(), job_id))
+    conn.commit()
@@ -0,0 +1,73 @@
+# Listing identity across scrapes and sources
+#
+#   content hash          fingerprint of what an ad says, to tell a changed listing from a re-scrape
+#   near-duplicate key    normalized title + price + address, shared by reposts of the same ad
+#                         under a new ad id; stored and indexed, so finding a repost is one lookup
+import hashlib
+import re
+import unicodedata
+
+import pandas as pd
+
+from normalize import NUMERIC_COLUMNS
+
+# Fields that identify or describe a stored row rather than the ad itself
+NON_CONTENT_FIELDS = {
+    "id", "ad_id", "url", "image_link", "scraped_date", "first_seen",
+    "content_hash", "dup_key", "duplicate_of", "category", "source",
+    "start_url", "scraper_order", *NUMERIC_COLUMNS,
+}
+
+
+def _present(value):
+    return value is not None and not (isinstance(value, float) and value != value) and value is not pd.NA
+
+
+def _normalize_text(value):
+    if not _present(value):
+        return ""
+    text = unicodedata.normalize('NFKD', str(value)).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', ' ', text.lower()).strip()
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+# Fingerprint of the content fields of a record (dict)
+def content_hash(record):
+    fields = sorted(
+        (key, str(value).strip()) for key, value in record.items()
+        if key not in NON_CONTENT_FIELDS and _present(value)
+    )
+    return _digest("\x1f".join(f"{key}={value}" for key, value in fields))
+
+
+# Key shared by ads with the same title, price and address (None without a title)
+def near_duplicate_key(record):
+    details = _normalize_text(record.get("details"))
+    address = _normalize_text(record.get("address"))
+    if not details:
+        return None
+    price = record.get("price_numeric")
+    price = f"{float(price):.0f}" if _present(price) else _normalize_text(record.get("price"))
+    return _digest(f"{details}|{price}|{address}")
+
+
+# Duplicates in a frame of listings, counted in linear time through hashing
+#   repeated: rows of a listing (same ad id, or same URL without one) seen earlier in the frame
+#   changed:  listings whose content differs between their rows
+#   reposts:  ads sharing their near-duplicate key with an earlier, different listing
+def duplicate_stats(df):
+    if df.empty:
+        return {"repeated": 0, "changed": 0, "reposts": 0}
+    identity = df["ad_id"].astype("string").fillna(df["url"].astype("string"))
+    records = df.to_dict('records')
+    hashes = pd.Series([content_hash(record) for record in records], index=df.index)
+    keys = pd.Series([near_duplicate_key(record) for record in records], index=df.index)
+
+    listings = pd.DataFrame({"identity": identity, "hash": hashes, "key": keys}).dropna(subset=["identity"])
+    changed = int((listings.groupby("identity")["hash"].nunique() > 1).sum())
+    first_rows = listings.drop_duplicates("identity").dropna(subset=["key"])
+    reposts = int(first_rows.duplicated("key").sum())
+    return {"repeated": int(listings.duplicated("identity").sum()), "changed": changed, "reposts": reposts}
@@ -0,0 +1,183 @@
+from hashlib import sha1
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'http')
+DEFAULT_TTL = 6 * 3600
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+
+# Raised in offline mode when a URL is not in the cache
+class CacheMiss(requests.RequestException):
+    pass
+
+
+# On-disk HTTP response cache with conditional revalidation and LRU eviction
+# Each URL is stored as <key>.body (raw bytes) and <key>.json (validators and timestamps).
+# Entries younger than ttl are served without any request; older ones are revalidated
+# with If-None-Match / If-Modified-Since and reused on 304 Not Modified.
+class ResponseCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, offline=False):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._index = None
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _key(self, url):
+        return sha1(url.encode('utf-8')).hexdigest()
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, key + suffix)
+
+    # key -> [size, last access], loaded lazily from the files already on disk
+    def _load_index(self):
+        if self._index is None:
+            self._index = {}
+            if os.path.isdir(self.directory):
+                for name in os.listdir(self.directory):
+                    if name.endswith('.body'):
+                        stat = os.stat(os.path.join(self.directory, name))
+                        self._index[name[:-5]] = [stat.st_size, stat.st_mtime]
+        return self._index
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def lookup(self, url):
+        key = self._key(url)
+        try:
+            with open(self._path(key, '.json'), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        entry["key"] = key
+        return entry
+
+    def is_fresh(self, entry, ttl=None):
+        return time.time() - entry["stored_at"] < (self.ttl if ttl is None else ttl)
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    # Build a response from a cache entry, marking it as recently used
+    # Returns None if the body was evicted since the lookup (by another thread or process):
+    # the entry is dropped and the caller treats the URL as a miss.
+    def response(self, entry, revalidated=False):
+        key = entry["key"]
+        try:
+            with open(self._path(key, '.body'), 'rb') as f:
+                body = f.read()
+        except OSError:
+            self._drop(key)
+            return None
+        now = time.time()
+        with self._lock:
+            index = self._load_index()
+            if key in index:
+                index[key][1] = now
+        try:
+            os.utime(self._path(key, '.body'), (now, now))
+        except OSError:
+            pass
+        if revalidated:
+            # A 304 restarts the freshness lifetime of the entry
+            entry = dict(entry, stored_at=now)
+            self._write_meta(key, entry)
+
+        self._count("revalidated" if revalidated else "hits")
+        res = requests.Response()
+        res.status_code = 200
+        res.url = entry["url"]
+        res._content = body
+        res.headers = CaseInsensitiveDict(entry.get("headers", {}))
+        res.encoding = entry.get("encoding")
+        return res
+
+    def miss(self, url, offline=None):
+        self._count("misses")
+        if self.offline if offline is None else offline:
+            raise CacheMiss(f"{url} is not cached (offline mode)")
+
+    def _drop(self, key):
+        for suffix in ('.body', '.json'):
+            try:
+                os.remove(self._path(key, suffix))
+            except OSError:
+                pass
+        with self._lock:
+            self._load_index().pop(key, None)
+
+    def _write_meta(self, key, entry):
+        meta = {k: v for k, v in entry.items() if k != "key"}
+        tmp = self._path(key, '.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._path(key, '.json'))
+
+    def store(self, url, res):
+        key = self._key(url)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self._path(key, '.body.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(res.content)
+        os.replace(tmp, self._path(key, '.body'))
+        self._write_meta(key, {
+            "url": url,
+            "etag": res.headers.get("ETag"),
+            "last_modified": res.headers.get("Last-Modified"),
+            "headers": {"Content-Type": res.headers.get("Content-Type", "text/html")},
+            "encoding": res.encoding,
+            "stored_at": time.time(),
+        })
+        with self._lock:
+            self._load_index()[key] = [len(res.content), time.time()]
+            self.stats["stores"] += 1
+        self.evict()
+
+    # Drop the least recently used entries until the cache fits in max_bytes
+    def evict(self):
+        with self._lock:
+            index = self._load_index()
+            total = sum(size for size, _ in index.values())
+            if total <= self.max_bytes:
+                return
+            for key, (size, _) in sorted(index.items(), key=lambda item: item[1][1]):
+                for suffix in ('.body', '.json'):
+                    try:
+                        os.remove(self._path(key, suffix))
+                    except OSError:
+                        pass
+                del index[key]
+                self.stats["evictions"] += 1
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def size(self):
+        with self._lock:
+            return sum(size for size, _ in self._load_index().values())
+
+    # Counters with the hit ratio (fresh hits and 304 revalidations count as hits)
+    def summary(self):
+        with self._lock:
+            summary = dict(self.stats)
+        lookups = summary["hits"] + summary["revalidated"] + summary["misses"]
+        summary["hit_ratio"] = (summary["hits"] + summary["revalidated"]) / lookups if lookups else 0.0
+        summary["bytes"] = self.size()
+        return summary
@@ -0,0 +1,158 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+import queue
+
+from database import DB_PATH, checkpoint_job, create_job, get_job, known_ad_ids
+from reporters import QueueReporter, Reporter
+from scraper import CATEGORIES, CategorySpec, iter_category, iter_details
+from sinks import SQLiteSink
+
+logger = logging.getLogger(__name__)
+
+
+# Start a new scrape job for category pages start_page..num_pages and run it
+def start_job(spec, num_pages, engine, db_path=DB_PATH, start_page=1, **kwargs):
+    job_id = create_job(spec.key, num_pages, db_path=db_path, start_page=start_page)
+    return job_id, run_job(job_id, engine, db_path=db_path, **kwargs)
+
+
+# One category of a parallel scrape: pages start_page..num_pages of a new job, or job_id to resume
+@dataclass(frozen=True)
+class ScrapeTarget:
+    spec: CategorySpec
+    num_pages: int = None
+    start_page: int = 1
+    job_id: int = None
+
+
+# Scrape several categories at the same time, one thread per category
+# Every job gets its own engine (engine.fork(): same HTTP client, per-host slots and rate
+# limiter, separate metrics) and writes to sinks[key] (its category table by default).
+# Reporter events are sent through a queue and replayed on reporters[key] in the calling
+# thread, so reporters may drive Streamlit widgets. options are passed to run_job.
+# Returns {category key: (job_id, stats)}; a job that raised has status 'interrupted' and the
+# exception under "error".
+def run_parallel(targets, engine, reporters=None, sinks=None, db_path=DB_PATH, **options):
+    reporters = reporters or {}
+    sinks = sinks or {}
+    events = queue.Queue()
+    job_ids = {}
+    for target in targets:
+        job_id = target.job_id
+        if job_id is None:
+            job_id = create_job(target.spec.key, target.num_pages, db_path=db_path, start_page=target.start_page)
+        job_ids[target.spec.key] = job_id
+
+    def run(key):
+        return run_job(job_ids[key], engine.fork(), reporter=QueueReporter(events, key), sink=sinks.get(key), db_path=db_path, **options)
+
+    def replay(timeout):
+        try:
+            key, event, args = events.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        getattr(reporters.get(key) or Reporter(), event)(*args)
+        return True
+
+    with ThreadPoolExecutor(max_workers=max(1, len(job_ids)), thread_name_prefix="scrape") as executor:
+        futures = {key: executor.submit(run, key) for key in job_ids}
+        while not all(future.done() for future in futures.values()):
+            replay(timeout=0.1)
+        while replay(timeout=0):
+            pass
+
+    results = {}
+    for key, future in futures.items():
+        error = future.exception()
+        if error is not None:
+            logger.error("[%s] job #%s failed: %s", key, job_ids[key], error)
+            results[key] = (job_ids[key], {"status": "interrupted", "error": error})
+        else:
+            results[key] = (job_ids[key], future.result())
+    return results
+
+
+# Run or resume a scrape job, checkpointing after every category page
+# Detail URLs and category pages that failed in previous attempts are retried first, then paging
+# continues after the last completed page. Records go to sink (the category table by default)
+# and progress to reporter. Returns the run counters (saved, skipped, failed...) with the
+# stage timings of the run under "metrics" (see metrics.RunMetrics).
+def run_job(job_id, engine, reporter=None, sink=None, incremental=True, stop_when_known=False, scraped_date=None, db_path=DB_PATH):
+    job = get_job(job_id, db_path=db_path)
+    spec = CATEGORIES[job["category"]]
+    scraped_date = scraped_date or datetime.now()
+    reporter = reporter or Reporter()
+    sink = sink or SQLiteSink(spec.table, scraped_date, db_path=db_path)
+    known_ids = (lambda ad_ids: known_ad_ids(spec.table, ad_ids, db_path=db_path)) if incremental else None
+    stats = {"saved": 0, "skipped": 0, "scraped_date": scraped_date}
+    failed_urls = []
+    failed_pages = []
+    checkpoint_job(job_id, status='running', db_path=db_path)
+    metrics = engine.metrics
+    metrics.reset()
+
+    def save(batch):
+        with metrics.stage("persist"):
+            stats["saved"] += sink.write(batch)
+        reporter.metrics_updated(spec, metrics.snapshot())
+
+    def on_page(index, total):
+        reporter.page_started(spec, index, total)
+
+    def on_error(index, error):
+        reporter.page_failed(spec, index, error)
+
+    try:
+        # Detail pages that failed last time
+        if job["failed_urls"]:
+            retry_stats = {}
+            for batch in iter_details(spec, job["failed_urls"], engine, stats=retry_stats):
+                save(batch)
+            failed_urls += retry_stats["failed_urls"]
+            checkpoint_job(job_id, failed_urls=failed_urls, db_path=db_path)
+
+        # Category pages that failed last time
+        for index in job["failed_pages"]:
+            page_stats = {}
+            for batch in iter_category(spec, index, engine, on_error=on_error, known_ids=known_ids, stats=page_stats, start_page=index):
+                save(batch)
+            stats["skipped"] += page_stats["skipped"]
+            failed_urls += page_stats["failed_urls"]
+            failed_pages += page_stats["failed_pages"]
+        checkpoint_job(job_id, failed_urls=failed_urls, failed_pages=failed_pages, db_path=db_path)
+
+        # Remaining pages, from the last checkpoint
+        page_stats = {}
+        batches = iter_category(
+            spec, job["target_pages"], engine,
+            on_page=on_page, on_error=on_error,
+            known_ids=known_ids, stop_when_known=stop_when_known,
+            stats=page_stats, start_page=job["pages_completed"] + 1
+        )
+        for batch in batches:
+            save(batch)
+            checkpoint_job(
+                job_id,
+                pages_completed=page_stats["last_page"],
+                failed_urls=failed_urls + page_stats["failed_urls"],
+                failed_pages=failed_pages + page_stats["failed_pages"],
+                db_path=db_path
+            )
+        stats["skipped"] += page_stats.get("skipped", 0)
+        failed_urls += page_stats.get("failed_urls", [])
+        failed_pages += page_stats.get("failed_pages", [])
+    except BaseException:
+        checkpoint_job(job_id, status='interrupted', db_path=db_path)
+        raise
+    finally:
+        with metrics.stage("persist"):
+            sink.close()
+
+    # Jobs with failures stay resumable so that only the failed URLs are retried
+    status = 'partial' if failed_urls or failed_pages else 'completed'
+    checkpoint_job(job_id, pages_completed=job["target_pages"], failed_urls=failed_urls, failed_pages=failed_pages, status=status, db_path=db_path)
+    stats.update(failed_urls=len(failed_urls), failed_pages=len(failed_pages), status=status, metrics=metrics.snapshot())
+    reporter.finished(spec, stats)
+    return stats
@@ -0,0 +1,104 @@
+import hashlib
+import os
+
+import pandas as pd
+import streamlit as st
+
+import normalize
+import schema
+from database import DB_PATH, connect, table_version
+from normalize import NUMERIC_COLUMNS, normalize_frame
+from schema import CSV_FILES, text_dtypes, to_canonical
+
+# Converted CSV exports, reused until the source file or the conversion code changes
+CANONICAL_CACHE_DIR = os.path.join('.cache', 'canonical')
+
+
+# Version of the conversion: a hash of the schema and normalization code, so that converted
+# frames cached by an older release are not reused after an upgrade
+def _conversion_version():
+    digest = hashlib.sha1()
+    for module in (schema, normalize):
+        with open(module.__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+CANONICAL_VERSION = _conversion_version()
+
+
+# Canonical, normalized frame of a CSV export (converted once per file and code version)
+@st.cache_data(show_spinner=False, max_entries=16)
+def _read_csv(key, path, mtime, size, version=CANONICAL_VERSION):
+    cached = os.path.join(CANONICAL_CACHE_DIR, f"{key}-{version}-{int(mtime)}-{size}.pkl")
+    if os.path.exists(cached):
+        return pd.read_pickle(cached)
+
+    columns = pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns
+    df = pd.read_csv(path, dtype=text_dtypes(columns), encoding='utf-8-sig')
+    df = normalize_frame(to_canonical(df, key, "csv"))
+
+    os.makedirs(CANONICAL_CACHE_DIR, exist_ok=True)
+    for name in os.listdir(CANONICAL_CACHE_DIR):
+        if name.startswith(f"{key}-"):
+            os.remove(os.path.join(CANONICAL_CACHE_DIR, name))
+    df.to_pickle(cached)
+    return df
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _read_table(key, table_name, db_path, version):
+    df = pd.read_sql(f'SELECT * FROM {table_name}', connect(db_path), parse_dates=['scraped_date'])
+    # Numeric columns that are entirely NULL would otherwise come back as object
+    for column in NUMERIC_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+    text_columns = [column for column in df.columns if df[column].dtype == object]
+    return to_canonical(df.astype(text_dtypes(text_columns)), key, "db")
+
+
+# CSV export of a category, re-read only when the file's mtime or size changes (None if missing)
+def load_csv(key):
+    path = CSV_FILES.get(key)
+    if not path or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return _read_csv(key, path, stat.st_mtime, stat.st_size, CANONICAL_VERSION)
+
+
+# Table of a category, re-read only after new rows are saved
+def load_table(spec, db_path=DB_PATH):
+    return _read_table(spec.key, spec.table, db_path, table_version(spec.table, db_path=db_path))
+
+
+# Data of a category: the CSV export when present, the database otherwise
+# Returns (df, source) with source "csv" or "db"
+def load_category(spec, db_path=DB_PATH):
+    df = load_csv(spec.key)
+    if df is not None:
+        return df, "csv"
+    return load_table(spec, db_path=db_path), "db"
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _read_warehouse(key, columns, filters, version):
+    import warehouse  # optional dependency (pyarrow), only needed for this source
+    return warehouse.read_listings(columns=columns, categories=[key], filters=filters)
+
+
+# Columns of a category from the Parquet warehouse, re-read only when its files change
+# filters are (column, op, value) conditions pushed down to the Parquet reader
+def load_warehouse(spec, columns=None, filters=()):
+    import warehouse  # optional dependency (pyarrow), only needed for this source
+    return _read_warehouse(
+        spec.key,
+        tuple(columns) if columns is not None else None,
+        tuple(tuple(condition) for condition in filters) or None,
+        warehouse.warehouse_version()
+    )
+
+
+# Uploaded CSV file, converted to the canonical schema of a category
+def load_upload(uploaded_file, spec):
+    df = pd.read_csv(uploaded_file, dtype="string", encoding='utf-8-sig')
+    return normalize_frame(to_canonical(df, spec.key, "upload"))
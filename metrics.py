@@ -0,0 +1,88 @@
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import threading
+import time
+
+# Stages of the scraping hot path
+#   fetch    HTTP requests (including retries and rate limiter waits)
+#   parse    building the BeautifulSoup trees
+#   extract  reading links and fields out of the trees
+#   persist  writing records to the sink (SQLite, CSV, Parquet...)
+STAGES = ("fetch", "parse", "extract", "persist")
+
+
+# Timings and counters of a scrape run, shared by the fetch threads
+# Stage times are summed over threads, so concurrent fetches can add up to more than
+# the wall-clock time; comparing the stages still shows where the run spends its time.
+class RunMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.perf_counter()
+            self.stages = {stage: {"calls": 0, "seconds": 0.0, "max": 0.0} for stage in STAGES}
+            self.counters = Counter()
+            self.failures = Counter()
+
+    # Time the body of a with block as one call of stage
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                timing = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "max": 0.0})
+                timing["calls"] += 1
+                timing["seconds"] += elapsed
+                timing["max"] = max(timing["max"], elapsed)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    # Count a failure by what failed (page, listing) and why (http_404, timeout, parse...)
+    def failed(self, kind, reason):
+        with self._lock:
+            self.counters[f"failed_{kind}s"] += 1
+            self.failures[f"{kind}: {reason}"] += 1
+
+    # JSON-serializable view of the run so far
+    def snapshot(self):
+        with self._lock:
+            elapsed = time.perf_counter() - self.started
+            stages = {
+                name: {
+                    "calls": timing["calls"],
+                    "seconds": round(timing["seconds"], 4),
+                    "avg_ms": round(timing["seconds"] / timing["calls"] * 1000, 2) if timing["calls"] else 0.0,
+                    "max_ms": round(timing["max"] * 1000, 2),
+                }
+                for name, timing in self.stages.items()
+            }
+            counters = dict(self.counters)
+            failures = dict(self.failures)
+        busiest = max(stages, key=lambda name: stages[name]["seconds"])
+        return {
+            "elapsed": round(elapsed, 3),
+            "listings_per_sec": round(counters.get("listings", 0) / elapsed, 2) if elapsed else 0.0,
+            "bottleneck": busiest if stages[busiest]["seconds"] else None,
+            "stages": stages,
+            "counters": counters,
+            "failures": failures,
+        }
+
+
+# Machine-readable report of one or more scrape runs
+def run_report(runs):
+    return {"generated_at": datetime.now().isoformat(timespec="seconds"), "runs": runs}
+
+
+def write_report(path, runs):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(run_report(runs), f, indent=2, default=str)
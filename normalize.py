@@ -0,0 +1,111 @@
+# Ingest-time normalization: typed numeric columns parsed once from the raw text fields
+#
+#   python normalize.py   writes cleaned copies of the CSV exports to data/clean/
+import os
+
+import numpy as np
+import pandas as pd
+
+# Numeric columns added by normalize_frame, with the canonical column they are parsed from
+NUMERIC_SOURCES = {
+    "price_numeric": "price",
+    "rooms": "number_of_rooms",
+    "bathrooms": "number_of_bathrooms",
+    "surface_m2": "surface",
+}
+NUMERIC_COLUMNS = ("price_numeric", "rooms", "bathrooms", "surface_m2", "price_per_m2")
+# Above this a room or bathroom count is a data-entry error
+MAX_COUNT = 50
+
+_SPACES = r'\s+'  # includes non-breaking and narrow spaces used as thousands separators
+_THOUSANDS = r'(?<=\d)\s(?=\d{3}\b)'
+_NUMBER = r'(\d+(?:[.,]\d+)?)'
+
+
+def _as_text(series):
+    return series.astype("string").str.lower().str.strip()
+
+
+def _to_float(numbers):
+    return pd.to_numeric(numbers.str.replace(',', '.', regex=False), errors='coerce')
+
+
+# Prices such as "250000", "250 000 CFA", "15 millions", "1,5 million", "Prix sur demande"
+def parse_price(series):
+    text = _as_text(series).str.replace(_SPACES, '', regex=True)
+    # Plain amounts: every digit belongs to the number ("250.000CFA" is 250000)
+    price = pd.to_numeric(text.str.replace(r'[^\d]', '', regex=True), errors='coerce')
+    # Amounts written in millions/billions keep their decimal part
+    for pattern, factor in ((r'million|mio|\d+m(?:cfa|fcfa)?$', 1e6), (r'milliard', 1e9)):
+        scaled = text.str.contains(pattern, regex=True, na=False)
+        price = price.mask(scaled, _to_float(text.str.extract(_NUMBER, expand=False)) * factor)
+    return price.mask(price <= 0).astype(float)
+
+
+# Counts such as "4", "4 pièces", "F4"
+# Surfaces mistakenly exported as counts ("150 m2", "549") are discarded
+def parse_count(series, upper=MAX_COUNT):
+    text = _as_text(series)
+    count = pd.to_numeric(text.str.extract(r'(\d+)', expand=False), errors='coerce')
+    count = count.mask(text.str.contains(r'm2|m²', regex=True, na=False) | (count > upper) | (count <= 0))
+    return count.astype("Int64")
+
+
+# Surfaces such as "400", "400 m2", "Terrain 200 m² Lac Rose", "2 ha"
+def parse_surface(series):
+    text = _as_text(series).str.replace(_THOUSANDS, '', regex=True)
+    with_unit = text.str.extract(_NUMBER + r'\s*(m2|m²|mètres?|metres?|ha|hectares?)\b')
+    surface = _to_float(with_unit[0]) * np.where(with_unit[1].str.startswith('h', na=False), 10000, 1)
+    # A bare number is a surface in m²
+    bare = _to_float(text.str.replace(_SPACES, '', regex=True).str.extract(r'^' + _NUMBER + r'$', expand=False))
+    surface = surface.fillna(bare)
+    return surface.mask(surface <= 0).astype(float)
+
+
+PARSERS = {
+    "price_numeric": parse_price,
+    "rooms": parse_count,
+    "bathrooms": parse_count,
+    "surface_m2": parse_surface,
+}
+
+
+# Add the typed numeric columns whose raw source column is present
+def normalize_frame(df):
+    df = df.copy()
+    for column, source in NUMERIC_SOURCES.items():
+        if source in df.columns:
+            df[column] = PARSERS[column](df[source])
+    if "price_numeric" in df.columns and "surface_m2" in df.columns:
+        df["price_per_m2"] = (df["price_numeric"] / df["surface_m2"]).round(2)
+    return df
+
+
+# Normalize a batch of records (list of dicts) before it is stored
+def normalize_records(records):
+    if not records:
+        return records
+    df = normalize_frame(pd.DataFrame(records))
+    df = df.astype(object).where(df.notna(), None)
+    return df.to_dict('records')
+
+
+# Cleaned copies of the CSV exports, in the canonical schema with the numeric columns added
+def write_clean_datasets(csv_files, output_dir=os.path.join('data', 'clean')):
+    from schema import to_canonical
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for key, path in csv_files.items():
+        if not os.path.exists(path):
+            continue
+        df = normalize_frame(to_canonical(pd.read_csv(path, dtype="string", encoding='utf-8-sig'), key, "csv"))
+        target = os.path.join(output_dir, f"{key}.csv")
+        df.to_csv(target, index=False)
+        written.append(target)
+    return written
+
+
+if __name__ == '__main__':
+    from schema import CSV_FILES
+    for target in write_clean_datasets(CSV_FILES):
+        print(f"Wrote {target}")
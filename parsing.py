@@ -0,0 +1,79 @@
+from bs4 import BeautifulSoup as bs
+from bs4 import SoupStrainer
+
+# Fastest available BeautifulSoup backend: lxml when installed, the pure Python parser otherwise
+try:
+    import lxml  # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+LISTING_CONTAINER_CLASS = 'col s6 m4 l3'
+
+TITLE_CLASS = 'title title-ad hide-on-large-and-down'
+IMAGE_CLASS = 'swiper-slide slide-clickable'
+
+# Only the nodes the scrapers read are built into the tree
+# Multi-valued classes are matched on the full attribute string, like the finders below
+LISTING_STRAINER = SoupStrainer('div', class_=LISTING_CONTAINER_CLASS)
+DETAIL_STRAINER = SoupStrainer(
+    ['h1', 'p', 'span', 'div'],
+    class_=[TITLE_CLASS, 'price', 'valign-wrapper', 'details-characteristics', IMAGE_CLASS]
+)
+
+
+def make_soup(content, parse_only=None, parser=None):
+    return bs(content, parser or PARSER, parse_only=parse_only)
+
+
+# Listing containers of a category page
+def parse_listing(content, parser=None):
+    soup = make_soup(content, LISTING_STRAINER, parser)
+    return soup.find_all('div', class_=LISTING_CONTAINER_CLASS)
+
+
+# Extra field extractors: each one receives the parsed detail page and its title
+def rooms_from_characteristics(soup_container, details):
+    # First 'qt' element of the characteristics block is the number of rooms/pieces
+    characteristics = soup_container.find('div', class_="details-characteristics")
+    qt = characteristics.find_all('span', 'qt') if characteristics else []
+    return qt[0].text.strip() if qt else None
+
+
+def surface_from_details(soup_container, details):
+    # For terrains the surface is part of the ad title (e.g. "Terrain 200 m2 Lac Rose")
+    return details.strip()
+
+
+# Tree of the nodes of a detail page the record is extracted from
+def detail_soup(content, parser=None):
+    return make_soup(content, DETAIL_STRAINER, parser)
+
+
+# Extract one listing record from a detail page
+def parse_detail(content, spec, parser=None):
+    return extract_detail(detail_soup(content, parser), spec)
+
+
+# Listing record of a parsed detail page
+def extract_detail(soup_container, spec):
+    details = soup_container.find('h1', TITLE_CLASS).text
+    # Cleaning price: removing spaces and 'CFA'
+    price_tag = soup_container.find('p', "price")
+    price = "".join(price_tag.text.strip().split()).replace('CFA', '') if price_tag else None
+
+    address_tags = soup_container.find_all('span', 'valign-wrapper')
+    address = address_tags[spec.address_index].text.strip() if len(address_tags) > spec.address_index else None
+
+    # Extracting image link from style attribute
+    img = soup_container.find('div', class_=IMAGE_CLASS)
+    style = img.get('style') if img else ''
+    image_link = style.split('url(')[1].split(')')[0].strip('"') if style and 'url(' in style else None
+
+    return {
+        "details": details,
+        "price": price,
+        "address": address,
+        spec.extra_field: spec.extract_extra(soup_container, details),
+        "image_link": image_link
+    }
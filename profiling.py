@@ -0,0 +1,123 @@
+import cProfile
+from datetime import datetime
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+PROFILE_DIR = os.path.join('data', 'profiles')
+
+# tracemalloc is process-wide: profilers of concurrent sessions share it (and see each
+# other's allocations), and it is stopped when the last of them stops, unless something
+# else had started it
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+
+def _acquire_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0:
+            _tracing_owned = not tracemalloc.is_tracing()
+            if _tracing_owned:
+                tracemalloc.start()
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+# Opt-in profiler of one rerun of a Streamlit page
+# The page calls stage(name) at each step (load, clean, aggregate, chart, table...): the
+# time and memory between two calls are charged to the earlier stage, so the page code
+# keeps its layout. Memory is traced with tracemalloc (allocated: still held at the end
+# of the stage, peak: highest extra memory while it ran). With cprofile, the whole rerun
+# also runs under cProfile and can be dumped as a .prof file (snakeviz, flameprof, gprof2dot).
+# When disabled every method is a no-op, so the calls can stay in the page. The page keeps
+# its profiler in the session state and stops the one of an interrupted rerun (Streamlit
+# stops a script midway when a widget changes) before starting the next.
+class RenderProfiler:
+    def __init__(self, page, enabled=False, cprofile=False):
+        self.page = page
+        self.enabled = enabled
+        self.stages = []
+        self._profile = cProfile.Profile() if enabled and cprofile else None
+        self._current = None
+        self._traced = False
+
+    def start(self, stage="setup"):
+        if not self.enabled or self._traced:
+            return self
+        _acquire_tracing()
+        self._traced = True
+        if self._profile is not None:
+            self._profile.enable()
+        self.stage(stage)
+        return self
+
+    # Close the running stage and start the next one
+    def stage(self, name):
+        if not self.enabled or not self._traced:
+            return
+        now = time.perf_counter()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._current is not None:
+            label, started, memory = self._current
+            self.stages.append({
+                "page": self.page,
+                "stage": label,
+                "ms": round((now - started) * 1000, 2),
+                "allocated_mb": round((current - memory) / 1e6, 3),
+                "peak_mb": round((peak - memory) / 1e6, 3),
+            })
+        tracemalloc.reset_peak()
+        self._current = (name, time.perf_counter(), tracemalloc.get_traced_memory()[0]) if name else None
+
+    def stop(self):
+        if not self.enabled or not self._traced:
+            return self
+        self.stage(None)
+        if self._profile is not None:
+            self._profile.disable()
+        _release_tracing()
+        self._traced = False
+        return self
+
+    # Stages of the rerun with their share of the total time
+    def breakdown(self):
+        df = pd.DataFrame(self.stages, columns=["page", "stage", "ms", "allocated_mb", "peak_mb"])
+        total = df["ms"].sum()
+        df["share"] = df["ms"] / total if total else 0.0
+        return df
+
+    # Most expensive functions of the rerun by cumulative time (needs cprofile)
+    def top_functions(self, limit=25):
+        if self._profile is None:
+            return None
+        stats = pstats.Stats(self._profile)
+        rows = [
+            {"function": f"{os.path.basename(filename)}:{line}({name})", "calls": calls,
+             "own_ms": round(own * 1000, 2), "cumulative_ms": round(cumulative * 1000, 2)}
+            for (filename, line, name), (_, calls, own, cumulative, _) in stats.stats.items()
+        ]
+        return pd.DataFrame(rows).sort_values("cumulative_ms", ascending=False).head(limit).reset_index(drop=True)
+
+    # Write the cProfile data (pstats format) and return its path
+    def dump(self, directory=PROFILE_DIR):
+        if self._profile is None:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        slug = "".join(char for char in self.page if char.isalnum() or char == " ").strip().lower().replace(" ", "_")
+        path = os.path.join(directory, f"{slug}_{datetime.now():%Y%m%d_%H%M%S}.prof")
+        self._profile.dump_stats(path)
+        return path
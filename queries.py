@@ -0,0 +1,318 @@
+# Dashboard queries: filters and aggregations answered by the store instead of pandas
+# SQLStore pushes them into SQLite as WHERE / GROUP BY / ORDER BY / LIMIT queries, so memory
+# and latency follow the size of the answer. FrameStore answers the same queries over an
+# in-memory frame (CSV exports, warehouse reads).
+from dataclasses import dataclass, replace
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from database import BINNED_COLUMNS, BINS_PER_DECADE, DB_PATH, connect, week_of
+from schema import to_canonical
+
+# Page sizes of the raw data table
+PAGE_SIZES = (25, 50, 100, 250)
+# Districts drawn in the price trend chart when none is selected
+TREND_DISTRICTS = 5
+# Bins of the distribution charts computed from filtered values
+HISTOGRAM_BINS = 30
+
+
+@dataclass(frozen=True)
+class ListingFilter:
+    min_price: float = None
+    max_price: float = None
+    addresses: tuple = ()
+    start: object = None  # first scrape day (date), inclusive
+    end: object = None  # last scrape day (date), inclusive
+    priced: bool = False  # only listings with a parsed price
+
+    def with_price(self):
+        return replace(self, priced=True)
+
+
+# Aggregates of the filtered listings, as shown in the dashboard metrics
+@dataclass(frozen=True)
+class ListingSummary:
+    count: int
+    locations: int
+    priced: int
+    avg_price: float
+    avg_rooms: float
+    avg_surface: float
+
+
+# Histogram of values up to upper, as a frame of bins (left, right, listings)
+def _histogram(values, upper, bins=HISTOGRAM_BINS):
+    values = np.asarray(values, dtype=float)
+    values = values[values <= upper]
+    if not len(values):
+        return pd.DataFrame(columns=["left", "right", "listings"])
+    counts, edges = np.histogram(values, bins=bins)
+    return pd.DataFrame({"left": edges[:-1], "right": edges[1:], "listings": counts})
+
+
+def _mean(total, count):
+    return total / count if count else None
+
+
+# Without filters, SQLStore reads the aggregates materialized by database triggers
+# (category_summary, address_counts, value_bins) instead of scanning the table.
+class SQLStore:
+    def __init__(self, spec, db_path=DB_PATH):
+        self.spec = spec
+        self.db_path = db_path
+
+    # Scope of the materialized aggregates answering these filters (None if they cannot, or
+    # if the table has none yet: the queries then run on the table itself)
+    def _scope(self, filters):
+        if replace(filters, priced=False) != ListingFilter():
+            return None
+        materialized = connect(self.db_path).execute(
+            'SELECT 1 FROM category_summary WHERE table_name = ?', (self.spec.table,)
+        ).fetchone()
+        if materialized is None:
+            return None
+        return "priced" if filters.priced else "all"
+
+    def _where(self, filters, *conditions):
+        conditions, params = list(conditions), []
+        if filters.priced:
+            conditions.append('price_numeric IS NOT NULL')
+        if filters.min_price is not None:
+            conditions.append('price_numeric >= ?')
+            params.append(filters.min_price)
+        if filters.max_price is not None:
+            conditions.append('price_numeric <= ?')
+            params.append(filters.max_price)
+        if filters.addresses:
+            conditions.append(f'address IN ({",".join("?" * len(filters.addresses))})')
+            params.extend(filters.addresses)
+        if filters.start is not None:
+            conditions.append('scraped_date >= ?')
+            params.append(str(filters.start))
+        if filters.end is not None:
+            conditions.append('scraped_date < ?')
+            params.append(str(filters.end + timedelta(days=1)))
+        return (f' WHERE {" AND ".join(conditions)}' if conditions else ''), params
+
+    def _query(self, sql, filters, *conditions, extra_params=()):
+        where, params = self._where(filters, *conditions)
+        return connect(self.db_path).execute(sql.format(table=self.spec.table, where=where), (*params, *extra_params))
+
+    def summary(self, filters):
+        scope = self._scope(filters)
+        if scope is not None:
+            conn = connect(self.db_path)
+            row = conn.execute(
+                'SELECT listings, price_count, price_sum, rooms_count, rooms_sum, surface_count, surface_sum '
+                'FROM category_summary WHERE table_name = ? AND scope = ?', (self.spec.table, scope)
+            ).fetchone()
+            if row is not None:
+                listings, price_count, price_sum, rooms_count, rooms_sum, surface_count, surface_sum = row
+                (locations,) = conn.execute(
+                    'SELECT COUNT(*) FROM address_counts WHERE table_name = ? AND scope = ?', (self.spec.table, scope)
+                ).fetchone()
+                return ListingSummary(
+                    listings, locations, price_count, _mean(price_sum, price_count),
+                    _mean(rooms_sum, rooms_count), _mean(surface_sum, surface_count)
+                )
+        row = self._query(
+            'SELECT COUNT(*), COUNT(DISTINCT address), COUNT(price_numeric), AVG(price_numeric), '
+            'AVG(rooms), AVG(surface_m2) FROM {table}{where}', filters
+        ).fetchone()
+        return ListingSummary(*row)
+
+    def top_addresses(self, filters, limit=10):
+        scope = self._scope(filters)
+        if scope is not None:
+            rows = connect(self.db_path).execute(
+                'SELECT address, listings FROM address_counts WHERE table_name = ? AND scope = ? '
+                'ORDER BY listings DESC LIMIT ?', (self.spec.table, scope, limit)
+            ).fetchall()
+            return pd.Series(dict(rows), dtype="int64")
+        rows = self._query(
+            'SELECT address, COUNT(*) AS n FROM {table}{where} GROUP BY address ORDER BY n DESC LIMIT ?',
+            filters, 'address IS NOT NULL', extra_params=(limit,)
+        ).fetchall()
+        return pd.Series(dict(rows), dtype="int64")
+
+    # Quantile q of a numeric column (the lower of the two nearest values)
+    def quantile(self, column, q, filters):
+        (count,) = self._query(f'SELECT COUNT({column}) FROM {{table}}{{where}}', filters).fetchone()
+        if not count:
+            return None
+        (value,) = self._query(
+            f'SELECT {column} FROM {{table}}{{where}} ORDER BY {column} LIMIT 1 OFFSET ?',
+            filters, f'{column} IS NOT NULL', extra_params=(int(q * (count - 1)),)
+        ).fetchone()
+        return value
+
+    # Non-null values of a numeric column up to upper, for distribution charts
+    def values(self, column, filters, upper=None):
+        conditions = [f'{column} IS NOT NULL'] + ([f'{column} <= {float(upper)}'] if upper is not None else [])
+        rows = self._query(f'SELECT {column} FROM {{table}}{{where}}', filters, *conditions).fetchall()
+        return pd.Series([row[0] for row in rows], name=column, dtype="float64")
+
+    # Distribution of a numeric column up to its q quantile, as bins (left, right, listings)
+    # Unfiltered, the log-spaced bins materialized by the triggers are used and the quantile
+    # is rounded up to the edge of its bin.
+    def histogram(self, column, filters, q=0.95):
+        scope = self._scope(filters)
+        if column in BINNED_COLUMNS and (scope == "all" or (scope == "priced" and column == "price_numeric")):
+            bins = pd.read_sql(
+                'SELECT bin, listings FROM value_bins WHERE table_name = ? AND column_name = ? AND listings > 0 ORDER BY bin',
+                connect(self.db_path), params=(self.spec.table, column)
+            )
+            bins["left"] = np.where(bins["bin"] > 0, 10 ** ((bins["bin"] - 1) / BINS_PER_DECADE), 0.0)
+            bins["right"] = 10 ** (bins["bin"] / BINS_PER_DECADE)
+            cumulative = bins["listings"].cumsum()
+            bins = bins[cumulative.shift(fill_value=0) < q * cumulative.iloc[-1]] if len(bins) else bins
+            return bins[["left", "right", "listings"]].reset_index(drop=True)
+        # Filtered: equal-width bins counted by SQLite, only the counts leave the database
+        upper = self.quantile(column, q, filters)
+        if upper is None:
+            return _histogram([], 0)
+        (lower,) = self._query(f'SELECT MIN({column}) FROM {{table}}{{where}}', filters).fetchone()
+        if upper <= lower:
+            return _histogram(self.values(column, filters, upper=upper), upper)
+        width = (upper - lower) / HISTOGRAM_BINS
+        counts = dict(self._query(
+            f'SELECT MIN(CAST(({column} - {float(lower)}) / {width} AS INTEGER), {HISTOGRAM_BINS - 1}) AS bin, COUNT(*) '
+            'FROM {table}{where} GROUP BY bin',
+            filters, f'{column} IS NOT NULL', f'{column} <= {float(upper)}'
+        ).fetchall())
+        edges = lower + width * np.arange(HISTOGRAM_BINS + 1)
+        return pd.DataFrame({
+            "left": edges[:-1], "right": edges[1:], "listings": [counts.get(index, 0) for index in range(HISTOGRAM_BINS)]
+        })
+
+    # One page of the filtered listings, most recent first
+    def rows(self, filters, limit=PAGE_SIZES[1], offset=0):
+        where, params = self._where(filters)
+        df = pd.read_sql(
+            f'SELECT * FROM {self.spec.table}{where} ORDER BY scraped_date DESC, id DESC LIMIT ? OFFSET ?',
+            connect(self.db_path), params=(*params, limit, offset), parse_dates=['scraped_date']
+        )
+        return to_canonical(df, self.spec.key, "db")
+
+    # Median price per district per week, read from the price_rollups table
+    # Only the district and date filters apply (rollups are per district and week).
+    def price_trend(self, filters, districts=TREND_DISTRICTS):
+        conditions, params = ['table_name = ?'], [self.spec.table]
+        if filters.start is not None:
+            conditions.append('week >= ?')
+            params.append(week_of(filters.start))
+        if filters.end is not None:
+            conditions.append('week <= ?')
+            params.append(str(filters.end))
+        if filters.addresses:
+            conditions.append(f'address IN ({",".join("?" * len(filters.addresses))})')
+            params.extend(filters.addresses)
+        else:
+            conditions.append(
+                f'address IN (SELECT address FROM price_rollups WHERE {" AND ".join(conditions)} '
+                'GROUP BY address ORDER BY SUM(listings) DESC LIMIT ?)'
+            )
+            params += params + [districts]
+        return pd.read_sql(
+            f'SELECT week, address, median_price, listings FROM price_rollups WHERE {" AND ".join(conditions)} ORDER BY week',
+            connect(self.db_path), params=params, parse_dates=['week']
+        )
+
+    # Every stored version of one listing, oldest first
+    def listing_history(self, ad_id):
+        return pd.read_sql(
+            'SELECT scraped_date, price, price_numeric, address, details FROM listing_history '
+            'WHERE table_name = ? AND ad_id = ? ORDER BY scraped_date',
+            connect(self.db_path), params=(self.spec.table, ad_id), parse_dates=['scraped_date']
+        )
+
+    # Options of the sidebar filters: districts by number of listings, price and date bounds
+    def filter_options(self):
+        addresses = self.top_addresses(ListingFilter(), limit=-1).index.tolist()
+        low, high, first, last = self._query(
+            'SELECT MIN(price_numeric), MAX(price_numeric), MIN(COALESCE(first_seen, scraped_date)), MAX(scraped_date) FROM {table}{where}',
+            ListingFilter()
+        ).fetchone()
+        first, last = (pd.Timestamp(first).date() if first else None), (pd.Timestamp(last).date() if last else None)
+        return {"addresses": addresses, "price": (low, high), "dates": (first, last)}
+
+
+class FrameStore:
+    def __init__(self, df):
+        self.df = df
+
+    def _filter(self, filters):
+        df = self.df
+        mask = pd.Series(True, index=df.index)
+        if filters.priced:
+            mask &= df['price_numeric'].notna()
+        if filters.min_price is not None:
+            mask &= df['price_numeric'] >= filters.min_price
+        if filters.max_price is not None:
+            mask &= df['price_numeric'] <= filters.max_price
+        if filters.addresses:
+            mask &= df['address'].isin(filters.addresses)
+        if filters.start is not None or filters.end is not None:
+            days = pd.to_datetime(df['scraped_date'], errors='coerce').dt.date
+            if filters.start is not None:
+                mask &= days >= filters.start
+            if filters.end is not None:
+                mask &= days <= filters.end
+        return df[mask.fillna(False).astype(bool)]
+
+    def summary(self, filters):
+        df = self._filter(filters)
+        return ListingSummary(
+            len(df), df['address'].nunique(), int(df['price_numeric'].notna().sum()),
+            df['price_numeric'].mean(), df['rooms'].mean(), df['surface_m2'].mean()
+        )
+
+    def top_addresses(self, filters, limit=10):
+        counts = self._filter(filters)['address'].value_counts()
+        counts = counts[counts > 0]  # Categorical counts include unused districts
+        return counts if limit < 0 else counts.head(limit)
+
+    def quantile(self, column, q, filters):
+        values = self._filter(filters)[column].dropna()
+        return values.quantile(q, interpolation='lower') if len(values) else None
+
+    def values(self, column, filters, upper=None):
+        values = self._filter(filters)[column].dropna().astype("float64")
+        return values if upper is None else values[values <= upper]
+
+    def histogram(self, column, filters, q=0.95):
+        upper = self.quantile(column, q, filters)
+        if upper is None:
+            return _histogram([], 0)
+        return _histogram(self.values(column, filters, upper=upper), upper)
+
+    # Most recent first, and the last rows of the file first within a scrape (as SQLStore orders by id)
+    def rows(self, filters, limit=PAGE_SIZES[1], offset=0):
+        df = self._filter(filters).iloc[::-1].sort_values(
+            'scraped_date', ascending=False, kind='stable', key=lambda dates: pd.to_datetime(dates, errors='coerce')
+        )
+        return df.iloc[offset:offset + limit]
+
+    def price_trend(self, filters, districts=TREND_DISTRICTS):
+        df = self._filter(replace(filters, min_price=None, max_price=None, priced=True))
+        df = df.assign(week=pd.to_datetime(df['scraped_date'], errors='coerce').dt.to_period('W-SUN').dt.start_time)
+        df = df.dropna(subset=['week', 'address'])
+        if not filters.addresses:
+            df = df[df['address'].isin(df['address'].value_counts().head(districts).index)]
+        trend = df.groupby(['week', 'address'], observed=True)['price_numeric'].agg(median_price='median', listings='size')
+        return trend.reset_index()
+
+    def listing_history(self, ad_id):
+        df = self.df[self.df['ad_id'] == ad_id]
+        return df[['scraped_date', 'price', 'price_numeric', 'address', 'details']].sort_values('scraped_date')
+
+    def filter_options(self):
+        dates = pd.to_datetime(self.df['scraped_date'], errors='coerce').dropna()
+        return {
+            "addresses": self.top_addresses(ListingFilter(), limit=-1).index.tolist(),
+            "price": (self.df['price_numeric'].min(), self.df['price_numeric'].max()),
+            "dates": (dates.min().date(), dates.max().date()) if len(dates) else (None, None),
+        }
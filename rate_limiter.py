@@ -0,0 +1,74 @@
+import threading
+import time
+
+DEFAULT_RATE = 4.0
+DEFAULT_MIN_RATE = 0.5
+DEFAULT_MAX_RATE = 20.0
+# Responses slower than this are treated as a sign that the site is struggling
+DEFAULT_TARGET_LATENCY = 2.0
+
+
+# Token bucket shared by every scraper request, with an adaptive refill rate
+# The rate grows additively while responses are fast and successful, and is cut
+# multiplicatively on 429/5xx or slow responses (AIMD, as in TCP congestion control).
+class AdaptiveRateLimiter:
+    def __init__(self, rate=DEFAULT_RATE, min_rate=DEFAULT_MIN_RATE, max_rate=DEFAULT_MAX_RATE,
+                 burst=None, target_latency=DEFAULT_TARGET_LATENCY, increase=0.25, decrease=0.5, cooldown=1.0):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst or max(1.0, rate)
+        self.target_latency = target_latency
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"acquired": 0, "waited": 0.0, "slowdowns": 0, "speedups": 0}
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    # Block until a request may be sent
+    def acquire(self):
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    self.stats["acquired"] += 1
+                    self.stats["waited"] += now - start
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    # Feed back the outcome of a request (status None for network errors)
+    def record(self, latency, status=None, retry_after=None):
+        with self._lock:
+            now = time.monotonic()
+            throttled = status is None or status == 429 or status >= 500
+            if throttled or latency > self.target_latency:
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+                # One cut per cooldown period, so a burst of concurrent failures halves the rate once
+                if now - self._last_decrease >= self.cooldown:
+                    self._refill(now)
+                    self.rate = max(self.min_rate, self.rate * self.decrease)
+                    self._last_decrease = now
+                    self.stats["slowdowns"] += 1
+            elif self.rate < self.max_rate:
+                self._refill(now)
+                self.rate = min(self.max_rate, self.rate + self.increase / max(self.rate, 1.0))
+                self.stats["speedups"] += 1
+
+    def summary(self):
+        with self._lock:
+            summary = dict(self.stats)
+            summary["rate"] = self.rate
+        return summary
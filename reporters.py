@@ -0,0 +1,72 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Progress reporting of a scrape run
+# The scraping pipeline only talks to a reporter, so it runs the same way in Streamlit,
+# from the command line or from cron. Subclasses override the events they care about.
+class Reporter:
+    def page_started(self, spec, index, total):
+        pass
+
+    def page_failed(self, spec, index, error):
+        pass
+
+    # Stage timings and counters so far (metrics.RunMetrics.snapshot), after every saved batch
+    def metrics_updated(self, spec, metrics):
+        pass
+
+    def finished(self, spec, stats):
+        pass
+
+
+# Reporter writing one log line per event (cron and CLI runs)
+class LogReporter(Reporter):
+    def __init__(self, log=None):
+        self.log = log or logger
+
+    def page_started(self, spec, index, total):
+        self.log.info("[%s] page %s/%s", spec.key, index, total)
+
+    def page_failed(self, spec, index, error):
+        self.log.error("[%s] page %s failed: %s", spec.key, index, error)
+
+    def metrics_updated(self, spec, metrics):
+        self.log.debug(
+            "[%s] %.1f listings/s, %s", spec.key, metrics["listings_per_sec"],
+            ", ".join(f"{name} {timing['seconds']:.2f}s" for name, timing in metrics["stages"].items())
+        )
+
+    def finished(self, spec, stats):
+        self.log.info(
+            "[%s] %s saved, %s skipped, %s failed listings, %s failed pages (%s)",
+            spec.key, stats["saved"], stats["skipped"], stats["failed_urls"], stats["failed_pages"], stats["status"]
+        )
+        metrics = stats.get("metrics")
+        if metrics:
+            self.log.info(
+                "[%s] %.1f listings/s, bottleneck: %s (%s)%s", spec.key, metrics["listings_per_sec"], metrics["bottleneck"],
+                ", ".join(f"{name} {timing['seconds']:.2f}s" for name, timing in metrics["stages"].items()),
+                "".join(f", {reason} x{count}" for reason, count in metrics["failures"].items())
+            )
+
+
+# Reporter putting its events on a queue as (key, event name, arguments), for runs in worker
+# threads whose progress is shown by another thread (Streamlit widgets belong to the script thread)
+class QueueReporter(Reporter):
+    def __init__(self, events, key):
+        self.events = events
+        self.key = key
+
+    def page_started(self, *args):
+        self.events.put((self.key, "page_started", args))
+
+    def page_failed(self, *args):
+        self.events.put((self.key, "page_failed", args))
+
+    def metrics_updated(self, *args):
+        self.events.put((self.key, "metrics_updated", args))
+
+    def finished(self, *args):
+        self.events.put((self.key, "finished", args))
@@ -0,0 +1,97 @@
+# Canonical column schema shared by CSV exports, database tables and uploaded files
+import re
+
+import pandas as pd
+
+from scraper import AD_ID_PATTERN
+
+# CSV exports shipped in data/, per category key
+CSV_FILES = {
+    "villas": "data/Villas.csv",
+    "terrains": "data/terrains_data.csv",
+    "apartments": "data/Apartments_data.csv",
+}
+
+# Raw columns of every source, in display order
+CANONICAL_COLUMNS = (
+    "ad_id",
+    "url",
+    "details",
+    "price",
+    "address",
+    "number_of_rooms",
+    "number_of_bathrooms",
+    "surface",
+    "image_link",
+    "start_url",
+    "scraper_order",
+    "scraped_date",
+)
+
+# Fixed dtypes of the numeric columns in typed outputs (Parquet), so that a batch of
+# missing values does not change the schema
+NUMERIC_DTYPES = {
+    "ad_id": "Int64",
+    "rooms": "Int64",
+    "bathrooms": "Int64",
+    "price_numeric": "float64",
+    "surface_m2": "float64",
+    "price_per_m2": "float64",
+}
+
+# Low-cardinality text columns stored as categoricals
+CATEGORICAL_COLUMNS = {"address", "start_url", "category", "source"}
+
+# Known spellings of each column, after lower-casing and turning spaces/hyphens into underscores
+COLUMN_ALIASES = {
+    "containers_link": "url",
+    "containers_links": "url",
+    "link": "url",
+    "title": "details",
+    "number_of_room": "number_of_rooms",
+    "number_of_bathroom": "number_of_bathrooms",
+    "surface_area": "surface",
+    "area": "surface",
+    "web_scraper_start_url": "start_url",
+    "web_scraper_order": "scraper_order",
+}
+
+# Per-export fixes applied before the aliases (None drops the column)
+# The terrains export stored the ad link in image_link and left containers empty.
+CSV_OVERRIDES = {
+    "terrains": {"image_link": "url", "containers": None},
+}
+
+
+def canonical_name(column):
+    name = column.replace('\ufeff', '').strip().lower()
+    name = re.sub(r'[\s\-]+', '_', name)
+    return COLUMN_ALIASES.get(name, name)
+
+
+# Convert a frame from any source (csv, db, upload) to the canonical schema
+# Columns are renamed, missing canonical columns are added empty, ad_id is derived from the
+# listing URL when absent, and category/source are recorded on every row.
+def to_canonical(df, category, source):
+    overrides = CSV_OVERRIDES.get(category, {}) if source == "csv" else {}
+    df = df.drop(columns=[column for column in df.columns if overrides.get(column, column) is None])
+    df = df.rename(columns=lambda column: canonical_name(overrides.get(column, column)))
+    df = df.loc[:, ~df.columns.duplicated()]
+
+    for column in CANONICAL_COLUMNS:
+        if column not in df.columns:
+            df[column] = pd.Series(pd.NA, index=df.index, dtype="string")
+    if df["ad_id"].isna().all():
+        df["ad_id"] = pd.to_numeric(
+            df["url"].astype("string").str.extract(AD_ID_PATTERN, expand=False), errors='coerce'
+        ).astype("Int64")
+    df["category"] = category
+    df["source"] = source
+
+    extra = [column for column in df.columns if column not in CANONICAL_COLUMNS]
+    return df[list(CANONICAL_COLUMNS) + extra]
+
+
+# Explicit dtypes of the text columns: categoricals for repeated values, nullable strings otherwise
+def text_dtypes(columns):
+    return {column: "category" if canonical_name(column) in CATEGORICAL_COLUMNS else "string" for column in columns}
@@ -0,0 +1,390 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urlparse
+import logging
+import re
+import threading
+import time
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import RunMetrics
+from parsing import detail_soup, extract_detail, parse_listing, rooms_from_characteristics, surface_from_details
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://sn.coinafrique.com"
+DEFAULT_TIMEOUT = 10
+DEFAULT_WORKERS = 8
+DEFAULT_PER_HOST = 4
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+# Longest wait before a retry, in seconds
+MAX_BACKOFF = 120
+# Transient statuses worth retrying (rate limiting and server errors)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+USER_AGENT = "Mozilla/5.0 (compatible; CoinafricaScraper/1.0)"
+# Ad ID at the end of a listing URL, e.g. .../location-appartements-4-pieces-mermoz-sacre-cur-4058141
+AD_ID_PATTERN = re.compile(r'-(\d+)/?(?:[?#].*)?$')
+
+
+# HTTP client shared by all scrapers
+# One requests.Session keeps connections alive in a pool, transient failures are retried
+# with exponential backoff, and every request is timed and counted. Each attempt, retries
+# included, waits for the rate limiter and reports back to it, so that a site answering
+# 429/5xx gets less traffic rather than a burst of retries.
+class ScraperClient:
+    def __init__(self, pool_size=DEFAULT_WORKERS, retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF, timeout=DEFAULT_TIMEOUT, cache=None, rate_limiter=None):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        # Optional http_cache.ResponseCache used for conditional requests
+        self.cache = cache
+        # Optional rate_limiter.AdaptiveRateLimiter shared by every request that reaches the network
+        self.rate_limiter = rate_limiter
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"requests": 0, "errors": 0, "retries": 0, "bytes": 0, "total_time": 0.0, "max_time": 0.0}
+
+    def _record(self, elapsed, error=False, retries=0, size=0):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["errors"] += int(error)
+            self.stats["retries"] += retries
+            self.stats["bytes"] += size
+            self.stats["total_time"] += elapsed
+            self.stats["max_time"] = max(self.stats["max_time"], elapsed)
+
+    # With revalidate, a cached copy is never served without asking the site whether it changed
+    # (category pages, where new ads appear well within the cache freshness lifetime).
+    # use_cache, ttl and offline override the cache settings for this request, so that runs
+    # with different settings share one cache (None keeps the cache's own ttl and offline).
+    def get(self, url, revalidate=False, use_cache=True, ttl=None, offline=None):
+        cache = self.cache if use_cache else None
+        entry = None
+        headers = {}
+        if cache is not None:
+            offline = cache.offline if offline is None else offline
+            entry = cache.lookup(url)
+            if entry is not None and (offline or (not revalidate and cache.is_fresh(entry, ttl))):
+                cached = cache.response(entry)
+                if cached is not None:
+                    return cached
+                entry = None
+            if entry is None:
+                cache.miss(url, offline)
+            headers = cache.conditional_headers(entry)
+        
+        # Failed attempts before the last one: their status, or the cause of a network error
+        history = []
+        elapsed = 0.0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                res, error = self.session.get(url, timeout=self.timeout, headers=headers), None
+            except requests.RequestException as e:
+                res, error = None, e
+            attempt = time.perf_counter() - start
+            elapsed += attempt
+            self._feedback(attempt, res)
+            transient = isinstance(error, (requests.ConnectionError, requests.Timeout)) or (
+                res is not None and res.status_code in RETRY_STATUSES
+            )
+            if not transient or len(history) >= self.retries:
+                break
+            history.append(res.status_code if res is not None else failure_reason(error))
+            delay = self._backoff(len(history), res)
+            time.sleep(delay)
+            elapsed += delay
+        
+        try:
+            if error is not None:
+                raise error
+            res.raise_for_status()
+        except requests.RequestException as e:
+            # Retries spent before giving up, read by FetchEngine.fetch
+            e.retries = len(history)
+            self._record(elapsed, error=True, retries=e.retries)
+            logger.warning("GET %s failed: %s", url, e)
+            raise
+        res.retry_history = history
+        self._record(elapsed, retries=len(history), size=len(res.content))
+        
+        if cache is not None:
+            if res.status_code == 304 and entry is not None:
+                cached = cache.response(entry, revalidated=True)
+                # Evicted while revalidating: the entry is gone, so this fetches the full page
+                return cached if cached is not None else self.get(url, revalidate, use_cache, ttl, offline)
+            if entry is not None:
+                cache.miss(url, offline)
+            cache.store(url, res)
+        return res
+
+    # Seconds to wait before retry number n (exponential, or the site's Retry-After if longer)
+    def _backoff(self, n, res):
+        delay = self.backoff_factor * 2 ** (n - 1)
+        if res is not None and res.headers.get("Retry-After", "").isdigit():
+            delay = max(delay, int(res.headers["Retry-After"]))
+        return min(delay, MAX_BACKOFF)
+
+    # Tell the rate limiter how the site answered one attempt (None for network errors)
+    def _feedback(self, elapsed, res):
+        if self.rate_limiter is None:
+            return
+        status = res.status_code if res is not None else None
+        retry_after = None
+        if res is not None and res.headers.get("Retry-After", "").isdigit():
+            retry_after = int(res.headers["Retry-After"])
+        self.rate_limiter.record(elapsed, status, retry_after)
+
+    # Snapshot of the counters with the average latency per request
+    def summary(self):
+        with self._lock:
+            summary = dict(self.stats)
+        summary["avg_time"] = summary["total_time"] / summary["requests"] if summary["requests"] else 0.0
+        summary["rate"] = self.rate_limiter.rate if self.rate_limiter is not None else None
+        return summary
+
+    def close(self):
+        self.session.close()
+
+
+# Failed attempts retried before a response was returned (none for cached responses)
+def retry_history(res):
+    return getattr(res, "retry_history", ())
+
+
+# Short machine-readable cause of a failed request or page, used as a metrics key
+def failure_reason(error):
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return f"http_{error.response.status_code}"
+    if isinstance(error, requests.Timeout):
+        return "timeout"
+    if isinstance(error, requests.ConnectionError):
+        return "connection"
+    return type(error).__name__
+
+
+# Concurrent fetch engine shared by all scrapers
+# A bounded thread pool fetches the detail pages of a category page in parallel,
+# while a semaphore per host caps the number of requests in flight on the same site.
+# base_url is the site scraped (a local mock site in benchmarks); metrics times the
+# stages of the runs using this engine, request_options are the cache settings of its
+# requests (ScraperClient.get use_cache, ttl, offline).
+class FetchEngine:
+    def __init__(self, client=None, max_workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST, base_url=BASE_URL, metrics=None):
+        self.client = client or ScraperClient(pool_size=max_workers)
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.base_url = base_url.rstrip('/')
+        self.metrics = metrics or RunMetrics()
+        self.request_options = {}
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def fetch(self, url, revalidate=False):
+        try:
+            with self._slot(url):
+                with self.metrics.stage("fetch"):
+                    res = self.client.get(url, revalidate=revalidate, **self.request_options)
+        except requests.RequestException as e:
+            self.metrics.count("retries", getattr(e, "retries", 0))
+            raise
+        # Responses served from the cache (no raw stream) were not downloaded
+        if res.raw is not None:
+            self.metrics.count("bytes", len(res.content))
+        self.metrics.count("retries", len(retry_history(res)))
+        return res
+
+    # Engine for a concurrent run: same client, pool size and per-host slots, its own metrics
+    # and cache settings
+    def fork(self, **request_options):
+        engine = FetchEngine(self.client, self.max_workers, self.per_host, self.base_url)
+        engine._host_slots, engine._lock = self._host_slots, self._lock
+        engine.request_options = request_options or dict(self.request_options)
+        return engine
+
+    def _fetch_safe(self, url):
+        try:
+            return self.fetch(url)
+        except Exception as e:
+            return e
+
+    # Fetch all urls and return the results in the same order as the input
+    # Failed requests are returned as the exception instead of a response
+    def fetch_all(self, urls):
+        urls = list(urls)
+        if not urls:
+            return []
+        workers = min(self.max_workers, len(urls))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self._fetch_safe, urls))
+
+
+# Build an absolute listing URL from a container link
+def absolute_url(href, base=BASE_URL):
+    return href if href.startswith('http') else base + href
+
+
+# Canonical ad ID of a listing URL (None if the URL has no trailing ID)
+def ad_id_from_url(url):
+    match = AD_ID_PATTERN.search(url or '')
+    return int(match.group(1)) if match else None
+
+
+# Extract the absolute detail-page links of the listing containers
+def container_links(containers, base=BASE_URL):
+    links = []
+    for container in containers:
+        link = container.find('a')
+        if link is not None and link.get('href'):
+            links.append(absolute_url(link['href'], base))
+    return links
+
+
+# Description of a Coinafrique category: where to scrape it and how it differs from the others
+@dataclass(frozen=True)
+class CategorySpec:
+    key: str
+    label: str
+    slug: str
+    table: str
+    address_index: int
+    extra_field: str
+    extract_extra: object
+
+    def page_url(self, index, base=BASE_URL):
+        return f"{base}/categorie/{self.slug}?page={index}"
+
+
+CATEGORIES = {
+    "villas": CategorySpec("villas", "🏡 Villas", "villas", "villas", 1, "number_of_rooms", rooms_from_characteristics),
+    "terrains": CategorySpec("terrains", "🏞️ Terrains", "terrains", "terrains", 0, "surface", surface_from_details),
+    "apartments": CategorySpec("apartments", "🏢 Apartments", "appartements", "apartments", 1, "number_of_rooms", rooms_from_characteristics),
+}
+
+
+# Look up a category spec from its selectbox label
+def category_from_label(label):
+    for spec in CATEGORIES.values():
+        if spec.label == label:
+            return spec
+    raise KeyError(label)
+
+
+# Fetch and parse detail pages, returning the records in listing order
+# URLs that could not be fetched or parsed are appended to stats["failed_urls"]
+# and counted by reason in engine.metrics.
+def fetch_records(spec, urls, engine, stats):
+    responses = engine.fetch_all(urls)
+    metrics = engine.metrics
+    
+    data = []
+    for url, res_container in zip(urls, responses):
+        if isinstance(res_container, Exception):
+            metrics.failed("listing", failure_reason(res_container))
+            stats["failed_urls"].append(url)
+            continue
+        try:
+            with metrics.stage("parse"):
+                soup_container = detail_soup(res_container.content)
+            with metrics.stage("extract"):
+                record = extract_detail(soup_container, spec)
+        except Exception as e:
+            logger.warning("Could not parse %s: %s", url, e)
+            metrics.failed("listing", "parse")
+            stats["failed_urls"].append(url)
+            continue
+        record["url"] = url
+        record["ad_id"] = ad_id_from_url(url)
+        data.append(record)
+    metrics.count("listings", len(data))
+    return data
+
+
+def _init_stats(stats):
+    stats = stats if stats is not None else {}
+    stats.setdefault("pages", 0)
+    stats.setdefault("skipped", 0)
+    stats.setdefault("failed_urls", [])
+    stats.setdefault("failed_pages", [])
+    return stats
+
+
+# Stream the listings of category pages start_page..num_pages, one list of records per page
+# on_page(index, num_pages) is called before each page, on_error(index, exception) when a page fails.
+# known_ids(ad_ids) returns the ad IDs already stored: those detail pages are not fetched again,
+# and with stop_when_known paging stops at the first category page where every ad is known.
+# Counters (pages, skipped, failed_urls, failed_pages, last_page) are written to the optional stats dict.
+def iter_category(spec, num_pages, engine, on_page=None, on_error=None, known_ids=None, stop_when_known=False, stats=None, start_page=1):
+    stats = _init_stats(stats)
+    seen = set()
+    
+    for index in range(start_page, num_pages + 1):
+        if on_page:
+            on_page(index, num_pages)
+        try:
+            # Category pages change as ads are posted: cached copies are always revalidated
+            res = engine.fetch(spec.page_url(index, engine.base_url), revalidate=True)
+            with engine.metrics.stage("parse"):
+                containers = parse_listing(res.content)
+            with engine.metrics.stage("extract"):
+                links = container_links(containers, engine.base_url)
+            
+            # Only fetch ads that are neither stored nor already scraped in this run
+            ids = [ad_id_from_url(url) for url in links]
+            known = known_ids(ids) if known_ids else set()
+            new_links = [url for url, ad_id in zip(links, ids) if ad_id is None or (ad_id not in known and ad_id not in seen)]
+            stats["skipped"] += len(links) - len(new_links)
+            seen.update(ad_id for ad_id in ids if ad_id is not None)
+            
+            if stop_when_known and links and not new_links:
+                logger.info("Page %s of %s is already known, stopping", index, spec.key)
+                break
+            
+            # Fetch the detail pages concurrently (results keep listing order)
+            data = fetch_records(spec, new_links, engine, stats)
+            stats["pages"] += 1
+            engine.metrics.count("pages")
+            
+        except Exception as e:
+            engine.metrics.failed("page", failure_reason(e))
+            stats["failed_pages"].append(index)
+            if on_error:
+                on_error(index, e)
+            data = []
+        
+        stats["last_page"] = index
+        yield data
+
+
+# Retry a list of detail URLs, yielding the records in batches of one category page
+def iter_details(spec, urls, engine, stats=None, batch_size=24):
+    stats = _init_stats(stats)
+    for start in range(0, len(urls), batch_size):
+        yield fetch_records(spec, urls[start:start + batch_size], engine, stats)
+
+
+# Scrape num_pages category pages of one category into a DataFrame
+def scrape_category(spec, num_pages, engine, **kwargs):
+    records = [record for batch in iter_category(spec, num_pages, engine, **kwargs) for record in batch]
+    return pd.DataFrame(records)
@@ -0,0 +1,120 @@
+import os
+
+import pandas as pd
+
+from database import DB_PATH, write_batches
+from normalize import normalize_frame
+from schema import NUMERIC_DTYPES
+
+OUTPUTS = ("sqlite", "csv", "parquet", "warehouse")
+
+
+# Destination of scraped records
+# write(batch) stores one list of records and returns the number of rows written.
+class SQLiteSink:
+    def __init__(self, table_name, scraped_date, db_path=DB_PATH):
+        self.table_name = table_name
+        self.scraped_date = scraped_date
+        self.db_path = db_path
+
+    def write(self, batch):
+        return write_batches(self.table_name, [batch], scraped_date=self.scraped_date, db_path=self.db_path)
+
+    def close(self):
+        pass
+
+
+# Append batches to a CSV file, writing the header only once
+class CSVSink:
+    def __init__(self, path, scraped_date):
+        self.path = path
+        self.scraped_date = scraped_date
+
+    def write(self, batch):
+        if not batch:
+            return 0
+        df = normalize_frame(pd.DataFrame(batch))
+        df['scraped_date'] = str(self.scraped_date)
+        header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        df.to_csv(self.path, mode='a', header=header, index=False)
+        return len(df)
+
+    def close(self):
+        pass
+
+
+# Write batches as row groups of a single Parquet file
+class ParquetSink:
+    def __init__(self, path, scraped_date):
+        import pyarrow  # noqa: F401  (optional dependency, only needed for this output)
+        self.path = path
+        self.scraped_date = scraped_date
+        self._writer = None
+
+    def write(self, batch):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if not batch:
+            return 0
+        df = normalize_frame(pd.DataFrame(batch))
+        df['scraped_date'] = str(self.scraped_date)
+        df = df.astype({column: NUMERIC_DTYPES.get(column, 'string') for column in df.columns})
+        if self._writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        else:
+            table = pa.Table.from_pandas(df, schema=self._writer.schema, preserve_index=False)
+        self._writer.write_table(table)
+        return len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+# Append batches to the partitioned Parquet warehouse, one file per batch
+class WarehouseSink:
+    def __init__(self, category, scraped_date, root=None):
+        import warehouse  # optional dependency (pyarrow), only needed for this output
+        self._warehouse = warehouse
+        self.category = category
+        self.scraped_date = scraped_date
+        self.root = root or warehouse.WAREHOUSE_DIR
+
+    def write(self, batch):
+        if not batch:
+            return 0
+        return self._warehouse.write_frame(pd.DataFrame(batch), self.category, self.scraped_date, root=self.root)
+
+    def close(self):
+        pass
+
+
+# Write every batch to several sinks; the first one gives the row count
+class TeeSink:
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def write(self, batch):
+        return [sink.write(batch) for sink in self.sinks][0]
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+# Build the sink of one category for an output target
+def make_sink(output, spec, scraped_date, output_dir=os.path.join('data', 'exports'), db_path=DB_PATH):
+    if output == "sqlite":
+        return SQLiteSink(spec.table, scraped_date, db_path=db_path)
+    if output == "warehouse":
+        return WarehouseSink(spec.key, scraped_date)
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = scraped_date.strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(output_dir, f"{spec.key}_scraped_{stamp}.{output}")
+    if output == "csv":
+        return CSVSink(path, scraped_date)
+    if output == "parquet":
+        return ParquetSink(path, scraped_date)
+    raise ValueError(f"Unknown output: {output}")
@@ -0,0 +1,11 @@
+import pytest
+
+from database import init_database
+
+
+# Empty database with the current schema, one file per test
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "coinafrica.db")
+    init_database(path)
+    return path
@@ -0,0 +1,84 @@
+import time
+
+from database import checkpoint_job, claim_job, create_job, enqueue_job, get_job, recent_jobs, requeue_job
+
+
+def test_enqueue_creates_a_job_for_the_range(db_path):
+    [(job_id, first, last, created)] = enqueue_job("villas", 10, db_path=db_path)
+    assert (first, last, created) == (1, 10, True)
+    job = get_job(job_id, db_path=db_path)
+    assert (job["status"], job["start_page"], job["target_pages"], job["pages_completed"]) == ('queued', 1, 10, 0)
+
+
+def test_enqueue_shares_pages_covered_by_an_active_job(db_path):
+    [(first_job, *_)] = enqueue_job("villas", 10, db_path=db_path)
+    jobs = enqueue_job("villas", 15, start_page=5, db_path=db_path)
+    assert jobs[0] == (first_job, 5, 10, False)
+    job_id, first, last, created = jobs[1]
+    assert (first, last, created) == (11, 15, True)
+    assert get_job(job_id, db_path=db_path)["start_page"] == 11
+
+
+def test_enqueue_fills_the_gaps_between_active_jobs(db_path):
+    [(low, *_)] = enqueue_job("villas", 3, db_path=db_path)
+    [(high, *_)] = enqueue_job("villas", 10, start_page=8, db_path=db_path)
+    jobs = enqueue_job("villas", 12, db_path=db_path)
+    assert [(first, last, created) for _, first, last, created in jobs] == [
+        (1, 3, False), (4, 7, True), (8, 10, False), (11, 12, True)
+    ]
+    assert jobs[0][0] == low and jobs[2][0] == high
+
+
+def test_enqueue_within_an_active_job_creates_nothing(db_path):
+    [(job_id, *_)] = enqueue_job("villas", 10, db_path=db_path)
+    assert enqueue_job("villas", 6, start_page=2, db_path=db_path) == [(job_id, 2, 6, False)]
+    assert len(recent_jobs(db_path=db_path)[0]) == 1
+
+
+def test_enqueue_ignores_other_categories_and_finished_jobs(db_path):
+    [(done, *_)] = enqueue_job("villas", 5, db_path=db_path)
+    checkpoint_job(done, pages_completed=5, status='completed', db_path=db_path)
+    enqueue_job("terrains", 5, db_path=db_path)
+    [(job_id, first, last, created)] = enqueue_job("villas", 5, db_path=db_path)
+    assert job_id != done and (first, last, created) == (1, 5, True)
+
+
+def test_claim_hands_out_the_oldest_queued_job_once(db_path):
+    [(first_job, *_)] = enqueue_job("villas", 5, db_path=db_path)
+    [(second_job, *_)] = enqueue_job("terrains", 5, db_path=db_path)
+    assert claim_job("worker-1", db_path=db_path) == first_job
+    assert claim_job("worker-2", db_path=db_path) == second_job
+    assert claim_job("worker-3", db_path=db_path) is None
+    job = get_job(first_job, db_path=db_path)
+    assert (job["status"], job["worker"]) == ('running', "worker-1")
+
+
+# A running job whose worker stopped checkpointing is handed to another worker
+def test_claim_takes_over_stale_jobs(db_path):
+    [(job_id, *_)] = enqueue_job("villas", 5, db_path=db_path)
+    assert claim_job("worker-1", db_path=db_path) == job_id
+    assert claim_job("worker-2", db_path=db_path) is None
+    time.sleep(0.01)
+    assert claim_job("worker-2", stale_after=0, db_path=db_path) == job_id
+    assert get_job(job_id, db_path=db_path)["worker"] == "worker-2"
+
+
+# A stalled job started by cli.py (no worker) is marked interrupted instead of claimed
+def test_claim_interrupts_stale_jobs_run_outside_the_queue(db_path):
+    job_id = create_job("villas", 5, db_path=db_path)
+    time.sleep(0.01)
+    assert claim_job("worker-1", stale_after=0, db_path=db_path) is None
+    assert get_job(job_id, db_path=db_path)["status"] == 'interrupted'
+
+
+def test_requeue_only_unfinished_jobs(db_path):
+    [(job_id, *_)] = enqueue_job("villas", 5, db_path=db_path)
+    assert not requeue_job(job_id, db_path=db_path)
+    claim_job("worker-1", db_path=db_path)
+    assert not requeue_job(job_id, db_path=db_path)
+
+    checkpoint_job(job_id, pages_completed=2, status='failed', error="boom", db_path=db_path)
+    assert requeue_job(job_id, db_path=db_path)
+    job = get_job(job_id, db_path=db_path)
+    assert (job["status"], job["error"], job["pages_completed"]) == ('queued', None, 2)
+    assert claim_job("worker-2", db_path=db_path) == job_id
@@ -0,0 +1,68 @@
+import sqlite3
+
+import pytest
+
+from database import SCHEMA_VERSION, connect, init_database
+
+# Category tables as created by the first release, before any migration
+BASELINE_TABLES = {"villas": "number_of_rooms", "terrains": "surface", "apartments": "number_of_rooms"}
+BASELINE_ROWS = [
+    ("Villa 5 pièces", "150 000 000 CFA", "Almadies, Dakar", "5", "villa.jpg", "2024-01-01 10:00:00"),
+    ("Villa 5 pièces", "150 000 000 CFA", "Almadies, Dakar", "5", "villa.jpg", "2024-01-01 10:00:00"),
+    ("Villa 3 pièces", "Prix sur demande", "Ngor, Dakar", "3", "villa-2.jpg", "2024-01-02 10:00:00"),
+]
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    path = str(tmp_path / "baseline.db")
+    conn = sqlite3.connect(path)
+    for table, column in BASELINE_TABLES.items():
+        conn.execute(
+            f'CREATE TABLE {table} (id INTEGER PRIMARY KEY AUTOINCREMENT, details TEXT, price TEXT, address TEXT, '
+            f'{column} TEXT, image_link TEXT, scraped_date TIMESTAMP)'
+        )
+    conn.executemany(
+        'INSERT INTO villas (details, price, address, number_of_rooms, image_link, scraped_date) VALUES (?, ?, ?, ?, ?, ?)',
+        BASELINE_ROWS
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+
+def _indexes(conn, table):
+    return {row[1]: row[2] for row in conn.execute(f'PRAGMA index_list({table})')}
+
+
+def test_baseline_database_is_migrated_to_the_current_schema(baseline_db):
+    init_database(baseline_db)
+    conn = connect(baseline_db)
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+    for table in BASELINE_TABLES:
+        assert {"url", "ad_id", "price_numeric", "surface_m2", "content_hash", "dup_key", "first_seen"} <= _columns(conn, table)
+        indexes = _indexes(conn, table)
+        assert indexes[f"idx_{table}_ad_id"] == 1
+        assert {f"idx_{table}_scraped_date", f"idx_{table}_address_date", f"idx_{table}_price"} <= set(indexes)
+    assert {"worker", "options", "stats"} <= _columns(conn, "scrape_jobs")
+
+
+# Rows of the first release have no ad id: they are all kept, with their numeric columns backfilled
+def test_baseline_rows_are_kept_and_backfilled(baseline_db):
+    init_database(baseline_db)
+    conn = connect(baseline_db)
+    rows = conn.execute('SELECT details, price_numeric, rooms FROM villas ORDER BY id').fetchall()
+    assert rows == [("Villa 5 pièces", 150000000.0, 5), ("Villa 5 pièces", 150000000.0, 5), ("Villa 3 pièces", None, 3)]
+    assert conn.execute("SELECT listings FROM category_summary WHERE table_name = 'villas' AND scope = 'all'").fetchone() == (3,)
+
+
+def test_migrations_run_once(baseline_db):
+    init_database(baseline_db)
+    init_database(baseline_db)
+    conn = connect(baseline_db)
+    assert conn.execute('SELECT COUNT(*) FROM villas').fetchone() == (3,)
+    assert conn.execute("SELECT listings FROM category_summary WHERE table_name = 'villas' AND scope = 'all'").fetchone() == (3,)
@@ -0,0 +1,38 @@
+from normalize import normalize_records
+
+
+def test_numeric_columns_are_parsed_from_the_raw_text():
+    records = normalize_records([
+        {"price": "250 000 CFA", "number_of_rooms": "F4", "surface": "400 m2"},
+        {"price": "1,5 million", "number_of_rooms": "3 pièces", "surface": "2 ha"},
+    ])
+    assert [record["price_numeric"] for record in records] == [250000.0, 1500000.0]
+    assert [record["rooms"] for record in records] == [4, 3]
+    assert [record["surface_m2"] for record in records] == [400.0, 20000.0]
+    assert [record["price_per_m2"] for record in records] == [625.0, 75.0]
+
+
+def test_raw_columns_are_kept():
+    record = normalize_records([{"details": "Villa 4 pièces", "price": "250 000 CFA"}])[0]
+    assert record["details"] == "Villa 4 pièces"
+    assert record["price"] == "250 000 CFA"
+
+
+# Values that cannot be parsed are stored as NULL, never as NaN
+def test_unparsable_values_become_none():
+    record = normalize_records([{"price": "Prix sur demande", "number_of_rooms": None, "surface": "à négocier"}])[0]
+    assert record["price_numeric"] is None
+    assert record["rooms"] is None
+    assert record["surface_m2"] is None
+    assert record["price_per_m2"] is None
+
+
+# A surface exported in the rooms column is not a room count
+def test_surfaces_are_not_room_counts():
+    records = normalize_records([{"number_of_rooms": "150 m2"}, {"number_of_rooms": "549"}])
+    assert [record["rooms"] for record in records] == [None, None]
+
+
+def test_only_columns_with_a_source_are_added():
+    assert normalize_records([{"details": "Terrain"}]) == [{"details": "Terrain"}]
+    assert normalize_records([]) == []
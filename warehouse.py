@@ -0,0 +1,151 @@
+# Columnar storage of the listings: a Parquet dataset partitioned by category and scrape day
+#
+#   data/warehouse/category=villas/scraped_day=2024-05-01/part-....parquet
+#
+# Readers load only the columns they ask for, and filters are pushed down to the partition
+# directories and to the row-group statistics, so a chart of price per address never
+# deserializes the text columns of the whole history.
+#
+#   python warehouse.py import    copies the SQLite category tables into the warehouse
+#   python warehouse.py compact   merges the small files written by streaming scrapes
+import os
+import sys
+import uuid
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from database import DB_PATH, connect
+from normalize import normalize_frame
+from schema import CANONICAL_COLUMNS, CATEGORICAL_COLUMNS, NUMERIC_DTYPES, to_canonical
+from scraper import CATEGORIES
+
+WAREHOUSE_DIR = os.path.join('data', 'warehouse')
+
+# Columns stored in every file (category and scraped_day live in the directory names)
+_ARROW_TYPES = {"Int64": pa.int64(), "float64": pa.float64()}
+SCHEMA = pa.schema(
+    [(column, _ARROW_TYPES[NUMERIC_DTYPES[column]] if column in NUMERIC_DTYPES else pa.string())
+     for column in CANONICAL_COLUMNS if column != "scraped_date"]
+    + [(column, _ARROW_TYPES[dtype]) for column, dtype in NUMERIC_DTYPES.items() if column not in CANONICAL_COLUMNS]
+    + [("scraped_date", pa.timestamp("us"))]
+)
+PARTITIONING = ds.partitioning(pa.schema([("category", pa.string()), ("scraped_day", pa.string())]), flavor="hive")
+# Arrow to pandas types, matching the frames returned by the CSV and database loaders
+_PANDAS_TYPES = {pa.string(): pd.StringDtype(), pa.int64(): pd.Int64Dtype()}
+
+
+def partition_dir(category, scraped_date, root=WAREHOUSE_DIR):
+    return os.path.join(root, f"category={category}", f"scraped_day={scraped_date:%Y-%m-%d}")
+
+
+# Frame in the file schema: canonical columns, typed numeric columns and the scrape timestamp
+# (scraped_date, unless the rows already carry their own)
+def to_table(df, scraped_date=None):
+    df = normalize_frame(to_canonical(df, None, None))
+    if scraped_date is not None and df["scraped_date"].isna().all():
+        df["scraped_date"] = pd.Timestamp(scraped_date)
+    df["scraped_date"] = pd.to_datetime(df["scraped_date"], errors='coerce')
+    df = df.astype({column: NUMERIC_DTYPES.get(column, "string") for column in SCHEMA.names if column != "scraped_date"})
+    return pa.Table.from_pandas(df[SCHEMA.names], schema=SCHEMA, preserve_index=False)
+
+
+# Append records of one scrape run as a new file of its partition. Returns the number of rows written.
+# Each call writes its own file, so rows written before a crash stay readable.
+def write_frame(df, category, scraped_date, root=WAREHOUSE_DIR):
+    if df.empty:
+        return 0
+    directory = partition_dir(category, scraped_date, root)
+    os.makedirs(directory, exist_ok=True)
+    _write_atomic(to_table(df, scraped_date), directory, f"part-{scraped_date:%H%M%S}-{uuid.uuid4().hex[:8]}.parquet")
+    return len(df)
+
+
+# Write to a hidden temporary file first, so readers never see a half-written file
+def _write_atomic(table, directory, name):
+    temporary = os.path.join(directory, f".{name}.tmp")
+    pq.write_table(table, temporary)
+    os.replace(temporary, os.path.join(directory, name))
+
+
+def _dataset(root=WAREHOUSE_DIR):
+    return ds.dataset(root, format="parquet", partitioning=PARTITIONING, schema=_full_schema(), ignore_prefixes=[".", "_"])
+
+
+def _full_schema():
+    return SCHEMA.append(pa.field("category", pa.string())).append(pa.field("scraped_day", pa.string()))
+
+
+# Load listings from the warehouse
+# columns: columns to read (all by default); categories: category keys to read (all by default)
+# filters: pyarrow expression, or conditions [(column, op, value), ...] combined with AND
+# (e.g. [("price_numeric", ">", 0), ("scraped_day", ">=", "2024-01-01")])
+def read_listings(columns=None, categories=None, filters=None, root=WAREHOUSE_DIR):
+    columns = list(columns) if columns is not None else _full_schema().names
+    if not os.path.isdir(root):
+        return pd.DataFrame({column: pd.Series(dtype=_PANDAS_TYPES.get(_full_schema().field(column).type))
+                             for column in columns})
+
+    expression = None
+    if filters is not None:
+        expression = filters if isinstance(filters, ds.Expression) else pq.filters_to_expression(list(filters))
+    if categories is not None:
+        by_category = ds.field("category").isin(list(categories))
+        expression = by_category if expression is None else expression & by_category
+
+    table = _dataset(root).to_table(columns=columns, filter=expression)
+    df = table.to_pandas(types_mapper=_PANDAS_TYPES.get)
+    categorical = [column for column in df.columns if column in CATEGORICAL_COLUMNS]
+    return df.astype({column: "category" for column in categorical})
+
+
+# Version of the warehouse (number and latest change of its files), used to invalidate cached reads
+def warehouse_version(root=WAREHOUSE_DIR):
+    count, latest = 0, 0.0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if name.endswith(".parquet"):
+                count += 1
+                latest = max(latest, os.path.getmtime(os.path.join(directory, name)))
+    return count, latest
+
+
+# Rewrite every partition holding several files as a single file
+def compact(root=WAREHOUSE_DIR):
+    compacted = []
+    for directory, _, files in os.walk(root):
+        parts = sorted(name for name in files if name.endswith(".parquet") and not name.startswith("."))
+        if len(parts) < 2:
+            continue
+        paths = [os.path.join(directory, name) for name in parts]
+        table = pa.concat_tables(pq.read_table(path, schema=SCHEMA) for path in paths).sort_by("scraped_date")
+        _write_atomic(table, directory, f"part-compacted-{uuid.uuid4().hex[:8]}.parquet")
+        for path in paths:
+            os.remove(path)
+        compacted.append(directory)
+    return compacted
+
+
+# Copy a SQLite category table into the warehouse, one file per scrape day
+def import_table(spec, db_path=DB_PATH, root=WAREHOUSE_DIR):
+    df = pd.read_sql(f'SELECT * FROM {spec.table}', connect(db_path))
+    df["scraped_date"] = pd.to_datetime(df["scraped_date"], errors='coerce').fillna(pd.Timestamp(datetime.now()))
+    written = 0
+    for day, rows in df.groupby(df["scraped_date"].dt.date):
+        written += write_frame(rows, spec.key, datetime.combine(day, datetime.min.time()), root)
+    return written
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else "import"
+    if command == "import":
+        for spec in CATEGORIES.values():
+            print(f"{spec.key}: {import_table(spec)} rows")
+    elif command == "compact":
+        for directory in compact():
+            print(f"Compacted {directory}")
+    else:
+        sys.exit(f"Unknown command: {command} (expected import or compact)")
@@ -0,0 +1,176 @@
+# Background scrape worker: runs the jobs queued in the scrape_jobs table (database.enqueue_job)
+#
+#   python worker.py                 poll the queue until interrupted
+#   python worker.py --once          run the queued jobs, then exit (e.g. from cron)
+#
+# The Streamlit app starts one worker thread pool per server process unless COINAFRICA_WORKER
+# is set to "external", in which case a separate `python worker.py` runs the jobs. Claiming a
+# job is a write transaction, so several workers (threads or processes) never run the same job.
+import argparse
+from datetime import datetime
+import logging
+import os
+import socket
+import sys
+import threading
+
+from database import DB_PATH, STALE_JOB_AFTER, checkpoint_job, claim_job, get_job, init_database
+from http_cache import ResponseCache
+from jobs import run_job
+from rate_limiter import AdaptiveRateLimiter
+from reporters import LogReporter
+from scraper import BASE_URL, CATEGORIES, DEFAULT_PER_HOST, DEFAULT_WORKERS, FetchEngine, ScraperClient
+from sinks import SQLiteSink, TeeSink, WarehouseSink
+
+logger = logging.getLogger(__name__)
+
+# Jobs run at the same time by one worker (one per category covers a full refresh)
+DEFAULT_CONCURRENCY = len(CATEGORIES)
+# Seconds between two looks at an empty queue
+POLL_INTERVAL = 2.0
+
+
+# Counters of the HTTP client of a job, its rate limiter and its response cache
+# They are shared by the jobs running on the same client, so they count since the worker started.
+def client_stats(client):
+    stats = {"http": client.summary()}
+    if client.rate_limiter is not None:
+        stats["limiter"] = client.rate_limiter.summary()
+    if client.cache is not None:
+        stats["cache"] = client.cache.summary()
+    return stats
+
+
+# Reporter logging the events of a queued job and saving its live metrics and client counters
+# in the job row, where the Streamlit page polls them
+class JobReporter(LogReporter):
+    def __init__(self, job_id, client, db_path=DB_PATH):
+        super().__init__()
+        self.job_id = job_id
+        self.client = client
+        self.db_path = db_path
+
+    def metrics_updated(self, spec, metrics):
+        super().metrics_updated(spec, metrics)
+        checkpoint_job(self.job_id, stats={"metrics": metrics, **client_stats(self.client)}, db_path=self.db_path)
+
+
+# Pool of threads taking jobs from the queue
+# Concurrent jobs share one HTTP client, its rate limiter and response cache (so the cache
+# size limit holds); the cache settings of a job (options use_cache, cache_ttl, offline)
+# apply to its requests, and each job gets its own engine metrics.
+class ScrapeWorker:
+    def __init__(self, db_path=DB_PATH, concurrency=DEFAULT_CONCURRENCY, poll_interval=POLL_INTERVAL,
+                 max_workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST, base_url=BASE_URL, rate_limiter=None):
+        self.db_path = db_path
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.base_url = base_url
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        client = ScraperClient(pool_size=max_workers, cache=ResponseCache(), rate_limiter=self.rate_limiter)
+        self.engine = FetchEngine(client, max_workers, per_host, base_url)
+        self._stopping = threading.Event()
+        self._threads = []
+
+    # Run one queued job; returns False when the queue is empty
+    def run_next(self):
+        job_id = claim_job(self.name, db_path=self.db_path)
+        if job_id is None:
+            return False
+        job = get_job(job_id, db_path=self.db_path)
+        spec = CATEGORIES[job["category"]]
+        options = job["options"]
+        scraped_date = datetime.now()
+        sink = SQLiteSink(spec.table, scraped_date, db_path=self.db_path)
+        if options.get("to_warehouse"):
+            sink = TeeSink(sink, WarehouseSink(spec.key, scraped_date))
+        logger.info("[%s] worker %s runs job #%s", spec.key, self.name, job_id)
+        engine = self.engine.fork(
+            use_cache=options.get("use_cache", True), ttl=options.get("cache_ttl"), offline=options.get("offline", False)
+        )
+        try:
+            stats = run_job(
+                job_id, engine, reporter=JobReporter(job_id, engine.client, self.db_path), sink=sink,
+                incremental=options.get("incremental", True), stop_when_known=options.get("stop_when_known", False),
+                scraped_date=scraped_date, db_path=self.db_path
+            )
+            checkpoint_job(job_id, stats={**stats, **client_stats(engine.client)}, db_path=self.db_path)
+        except Exception as e:
+            # run_job has already marked the job interrupted; it can be queued again from its checkpoint
+            logger.exception("[%s] job #%s failed", spec.key, job_id)
+            checkpoint_job(job_id, error=str(e), db_path=self.db_path)
+        return True
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            if not self.run_next():
+                self._stopping.wait(self.poll_interval)
+
+    # Run the queued jobs in the calling thread until the queue is empty
+    def drain(self):
+        while self.run_next():
+            pass
+
+    def start(self):
+        for index in range(self.concurrency):
+            thread = threading.Thread(target=self._loop, name=f"scrape-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    # Block until stop() is called (from another thread or a signal handler)
+    def wait(self):
+        while not self._stopping.wait(1.0):
+            pass
+
+    # Stop taking jobs and wait for the running ones
+    def stop(self):
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the scrape jobs queued from the dashboard")
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database holding the job queue")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="jobs run at the same time")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="concurrent detail-page fetches per job")
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST, help="maximum requests in flight per host")
+    parser.add_argument('--base-url', default=BASE_URL, help="site to scrape (e.g. a local mock site)")
+    parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL, help="seconds between two looks at an empty queue")
+    parser.add_argument('--once', action='store_true', help="exit once the queue is empty")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(threadName)s %(message)s"
+    )
+    init_database(args.db)
+    worker = ScrapeWorker(args.db, args.concurrency, args.poll_interval, args.workers, args.per_host, args.base_url)
+    logging.info("Worker %s polling %s (jobs stalled for %ss are taken over)", worker.name, args.db, STALE_JOB_AFTER)
+    if args.once:
+        threads = [threading.Thread(target=worker.drain) for _ in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return 0
+    worker.start()
+    try:
+        worker.wait()
+    except KeyboardInterrupt:
+        logging.info("Stopping after the running jobs")
+        worker.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())